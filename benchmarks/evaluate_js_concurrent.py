@@ -0,0 +1,56 @@
+"""
+This benchmark measures the throughput of evaluate_js, when called concurrently from several threads, and checks that
+every call gets its own result. The Qt implementation evaluates code with CEF and delivers the results asynchronously,
+so it is the one to watch. Set USE_QT to select it instead of GTK or Cocoa; on Linux without a display run it under
+Xvfb:
+
+    USE_QT=1 xvfb-run python benchmarks/evaluate_js_concurrent.py
+
+Without USE_QT it measures the default implementation of the platform.
+"""
+
+import threading
+import time
+
+import webview
+
+THREADS = 8
+CALLS = 500
+
+
+def benchmark():
+    def evaluate(thread_id):
+        for i in range(CALLS):
+            expected = thread_id * CALLS + i
+            result = webview.evaluate_js('({{thread: {0}, value: {1} * 2}})'.format(thread_id, expected))
+            assert result == {'thread': thread_id, 'value': expected * 2}, result
+
+    webview.evaluate_js('1')  # wait for the page to load
+
+    threads = [threading.Thread(target=evaluate, args=(i,)) for i in range(THREADS)]
+    start = time.time()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.time() - start
+    print('{0} evaluations in {1:.2f} s: {2:.0f} evaluations per second'.format(
+        THREADS * CALLS, elapsed, THREADS * CALLS / elapsed))
+
+    start = time.time()
+    webview.evaluate_js_many(['{0} * 2'.format(i) for i in range(THREADS * CALLS)])
+    elapsed = time.time() - start
+    print('{0} evaluations with evaluate_js_many in {1:.2f} s: {2:.0f} evaluations per second'.format(
+        THREADS * CALLS, elapsed, THREADS * CALLS / elapsed))
+
+    webview.destroy_window()
+
+
+if __name__ == '__main__':
+    t = threading.Thread(target=benchmark)
+    t.start()
+
+    webview.create_window('evaluate_js benchmark', 'https://www.example.org')
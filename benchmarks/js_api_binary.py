@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+import time
+import webview
+
+"""
+This benchmark measures the time it takes to receive a binary JS API result in the page, i.e. the time between calling
+a window.pywebview.api function returning bytes and the resolution of the returned promise with a Uint8Array. On Linux
+run it under Xvfb to benchmark the GTK implementation:
+
+    xvfb-run python benchmarks/js_api_binary.py
+"""
+
+SIZES_MB = (1, 10, 100)
+
+html = """
+<!DOCTYPE html>
+<html>
+<body>
+<script>
+function now() {
+    return window.performance ? window.performance.now() : new Date().getTime();
+}
+
+function runBenchmark(size) {
+    var start = now();
+    window.benchmarkResult = null;
+
+    window.pywebview.api.get_bytes(size).then(function(data) {
+        window.benchmarkResult = JSON.stringify({ time: now() - start, length: data.length });
+    });
+}
+</script>
+</body>
+</html>
+"""
+
+
+class Api:
+    def __init__(self):
+        self.data = os.urandom(max(SIZES_MB) * 1024 * 1024)
+
+    def get_bytes(self, size):
+        return memoryview(self.data)[:size]
+
+
+def run_benchmark():
+    webview.load_html(html)
+
+    for size_mb in SIZES_MB:
+        webview.evaluate_js('runBenchmark({0})'.format(size_mb * 1024 * 1024))
+
+        result = None
+        while not result:
+            time.sleep(0.1)
+            result = webview.evaluate_js('window.benchmarkResult')
+
+        result = json.loads(result)
+        print('{0} MB: {1:.0f} ms ({2:.1f} MB/s)'.format(size_mb, result['time'], size_mb / result['time'] * 1000))
+
+    webview.destroy_window()
+
+
+if __name__ == '__main__':
+    t = threading.Thread(target=run_benchmark)
+    t.start()
+
+    webview.create_window('JS API binary payload benchmark', js_api=Api())
@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+import webview
+
+"""
+This benchmark measures the round trip time of JS API calls, i.e. the time between calling a window.pywebview.api
+function and the resolution of the returned promise. Calls are made one after another and the 50th and 99th percentiles
+are printed. On Linux run it under Xvfb to benchmark the GTK implementation:
+
+    xvfb-run python benchmarks/js_api_roundtrip.py
+"""
+
+ITERATIONS = 500
+
+html = """
+<!DOCTYPE html>
+<html>
+<body>
+<script>
+function now() {
+    return window.performance ? window.performance.now() : new Date().getTime();
+}
+
+function runBenchmark(iterations) {
+    var timings = [];
+
+    function next(i) {
+        var start = now();
+
+        window.pywebview.api.ping(i).then(function() {
+            timings.push(now() - start);
+
+            if (i + 1 < iterations) {
+                next(i + 1);
+            } else {
+                window.benchmarkResult = JSON.stringify(timings);
+            }
+        });
+    }
+
+    next(0);
+}
+</script>
+</body>
+</html>
+"""
+
+
+class Api:
+    def ping(self, params):
+        return params
+
+
+def percentile(timings, p):
+    index = int(round(p / 100.0 * (len(timings) - 1)))
+    return timings[index]
+
+
+def run_benchmark():
+    webview.load_html(html)
+    webview.evaluate_js('runBenchmark({0})'.format(ITERATIONS))
+
+    result = None
+    while not result:
+        time.sleep(0.5)
+        result = webview.evaluate_js('window.benchmarkResult')
+
+    timings = sorted(json.loads(result))
+    print('{0} calls, p50: {1:.2f} ms, p99: {2:.2f} ms'.format(len(timings), percentile(timings, 50), percentile(timings, 99)))
+
+    webview.destroy_window()
+
+
+if __name__ == '__main__':
+    t = threading.Thread(target=run_benchmark)
+    t.start()
+
+    webview.create_window('JS API round trip benchmark', js_api=Api())
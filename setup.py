@@ -17,6 +17,10 @@ elif platform.system() == "Linux":
         'gtk3': ['PyGObject'],
         'qt5': ['PyQt5'],
     }
+else:
+    extras_require = {}
+
+extras_require['orjson'] = ['orjson']
 
 setup(
     name="pywebview",
@@ -0,0 +1,104 @@
+import sys
+import threading
+
+import pytest
+
+import webview
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 5), reason='webview.aio requires Python 3.5')
+
+
+class Gui(object):
+    """
+    GUI implementation running scheduled functions on its own thread
+    """
+
+    def __init__(self):
+        self.url = None
+        self.threads = []
+        self.discarded = threading.Event()
+        self._functions = []
+        self._condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, func, uid=None):
+        if uid not in (None, 'master'):
+            raise KeyError(uid)
+
+        with self._condition:
+            self._functions.append(func)
+            self._condition.notify()
+
+    def load_url(self, url, uid):
+        self.threads.append(threading.current_thread())
+        self.url = url
+
+    def get_current_url(self, uid):
+        self.threads.append(threading.current_thread())
+        return self.url
+
+    def set_title(self, title, uid):
+        raise ValueError(title)
+
+    def evaluate_js_async(self, script, uid, callback):
+        # The page never returns the result
+        return self.discarded.set
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._functions:
+                    self._condition.wait()
+
+                func = self._functions.pop(0)
+
+            func()
+
+
+@pytest.fixture
+def gui(monkeypatch):
+    import asyncio
+
+    gui = Gui()
+    monkeypatch.setattr(webview, 'gui', gui, raising=False)
+    monkeypatch.setattr(webview, '_webview_ready', threading.Event())
+    webview._webview_ready.set()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    gui.loop = loop
+
+    yield gui
+
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_functions_complete_on_gui_thread(gui):
+    import webview.aio
+
+    assert gui.loop.run_until_complete(webview.aio.load_url('https://example.org')) is None
+    assert gui.loop.run_until_complete(webview.aio.get_current_url()) == 'https://example.org'
+    assert gui.threads == [gui.thread, gui.thread]
+
+
+def test_errors(gui):
+    import webview.aio
+
+    with pytest.raises(ValueError):
+        gui.loop.run_until_complete(webview.aio.set_title('title'))
+
+    with pytest.raises(Exception):
+        webview.aio.load_url('https://example.org', 'unknown')
+
+
+def test_evaluate_js_timeout(gui):
+    import webview.aio
+
+    with pytest.raises(webview.JavascriptTimeoutError):
+        gui.loop.run_until_complete(webview.aio.evaluate_js('1', timeout=0.05))
+
+    # The callback waiting for the result is dropped
+    assert gui.discarded.is_set()
@@ -0,0 +1,248 @@
+import inspect
+import sys
+import threading
+
+import pytest
+
+import webview
+import webview.bridge
+from webview.bridge import BACKGROUND, DISCARD_OLDEST, INTERACTIVE, NORMAL, REJECT, BridgeExecutor, \
+    is_async_generator, is_coroutine, is_coroutine_function
+
+
+def test_no_coroutine_support(monkeypatch):
+    # Python 2 and 3.4
+    monkeypatch.setattr(webview.bridge, '_coroutines_supported', False)
+
+    def function(params):
+        pass
+
+    assert not is_coroutine_function(function)
+    assert not is_coroutine(function)
+    assert not is_async_generator(iter(()))
+
+
+def test_coroutine_support_detection():
+    expected = webview.bridge.asyncio is not None and hasattr(inspect, 'iscoroutinefunction') and \
+        hasattr(webview.bridge.asyncio, 'run_coroutine_threadsafe')
+
+    assert webview.bridge._coroutines_supported == expected
+
+
+def test_emit_to_unknown_window():
+    threads = threading.active_count()
+
+    with pytest.raises(Exception):
+        webview.emit('event', {'value': 1}, 'unknown')
+
+    webview._js_bridge_call('unknown', object(), '_batch', '[]')
+
+    assert webview._get_bridge('unknown') is None
+    assert threading.active_count() == threads
+
+
+def test_emit_after_close():
+    webview._create_js_bridge('closed')
+    webview.emit('event', None, 'closed')
+    webview._shutdown_js_bridge('closed')
+
+    with pytest.raises(Exception):
+        webview.emit('event', None, 'closed')
+
+    webview._js_bridge_call('closed', object(), '_batch', '[]')
+    assert webview._get_bridge('closed') is None
+
+
+
+def test_shutdown_cancels_under_lock():
+    class Cancellable(object):
+        cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    class Registry(dict):
+        def values(self):
+            assert bridge._calls_lock.locked()
+            return super(Registry, self).values()
+
+    webview._create_js_bridge('cancelled')
+    bridge = webview._get_bridge('cancelled')
+    call, coalescer, stream = Cancellable(), Cancellable(), Cancellable()
+    bridge.calls = Registry(call=call)
+    bridge.coalescers = Registry(function=coalescer)
+    bridge.streams = Registry(stream=stream)
+
+    webview._shutdown_js_bridge('cancelled')
+
+    assert call.cancelled and coalescer.cancelled and stream.cancelled
+
+
+@webview.namespace
+class Database(object):
+    def query(self, params):
+        pass
+
+
+@webview.namespace
+class Files(object):
+    def read(self, params):
+        pass
+
+
+class Api(object):
+    def __init__(self, service):
+        self.service = service
+
+    def ping(self, params):
+        pass
+
+
+def test_api_js_of_instance_namespaces():
+    database_js = webview._parse_api_js(Api(Database()))
+    files_js = webview._parse_api_js(Api(Files()))
+
+    assert '"query"' in database_js and '"read"' not in database_js
+    assert '"read"' in files_js and '"query"' not in files_js
+    assert webview._parse_api_js(Api(Database())) is database_js
+
+    webview.invalidate_js_api(Api)
+    assert webview._parse_api_js(Api(Files())) is not files_js
+
+
+class Blocker(object):
+    """
+    A call occupying a worker until it is released
+    """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.released.wait(5)
+
+
+@pytest.fixture
+def executors():
+    created = []
+
+    def create(**kwargs):
+        executor = BridgeExecutor('test', **kwargs)
+        created.append(executor)
+        return executor
+
+    yield create
+
+    for executor in created:
+        executor.shutdown(wait=True)
+
+
+def run_in_order(executor, calls):
+    """
+    Submit (name, priority) calls while the only worker is blocked, then release it
+    :return: names of the calls in the order of their execution
+    """
+    order = []
+    done = threading.Event()
+    blocker = Blocker()
+
+    executor.submit(blocker)
+    assert blocker.started.wait(5)
+
+    for name, priority in calls:
+        executor.submit(order.append, (name,), priority=priority)
+
+    executor.submit(done.set, priority=BACKGROUND)
+    blocker.released.set()
+    assert done.wait(5)
+    return order
+
+
+def test_executor_lanes(executors):
+    executor = executors(max_workers=1)
+    order = run_in_order(executor, [('b1', BACKGROUND), ('n1', NORMAL), ('i1', INTERACTIVE), ('n2', NORMAL),
+                                    ('i2', INTERACTIVE)])
+
+    assert order == ['i1', 'i2', 'n1', 'n2', 'b1']
+
+
+def test_executor_starvation(executors):
+    executor = executors(max_workers=1, starvation_limit=2)
+    order = run_in_order(executor, [('n1', NORMAL)] + [('i{0}'.format(i), INTERACTIVE) for i in range(1, 6)])
+
+    assert order == ['i1', 'i2', 'n1', 'i3', 'i4', 'i5']
+
+
+def test_executor_reserves_interactive_worker(executors):
+    executor = executors(max_workers=2)
+    normal = Blocker()
+    interactive = Blocker()
+    second = threading.Event()
+
+    executor.submit(normal)
+    assert normal.started.wait(5)
+
+    # The second worker is kept free for interactive calls
+    executor.submit(second.set)
+    assert not second.wait(0.2)
+
+    executor.submit(interactive, priority=INTERACTIVE)
+    assert interactive.started.wait(5)
+    assert executor.stats()[NORMAL]['queued'] == 1
+    assert executor.stats()[INTERACTIVE]['running'] == 1
+
+    interactive.released.set()
+    normal.released.set()
+    assert second.wait(5)
+
+
+def test_executor_make_room(executors):
+    executor = executors(max_workers=1, queue_size=2, rejection_policy=REJECT)
+    blocker = Blocker()
+    discarded = []
+
+    def submit(name, priority):
+        return executor.submit(lambda: None, on_discard=lambda: discarded.append(name), priority=priority)
+
+    executor.submit(blocker)
+    assert blocker.started.wait(5)
+
+    assert submit('b1', BACKGROUND) and submit('b2', BACKGROUND)
+
+    # The newest call of a less urgent lane makes room
+    assert submit('n1', NORMAL)
+    assert discarded == ['b2']
+    assert not submit('b3', BACKGROUND)
+    assert submit('i1', INTERACTIVE)
+    assert discarded == ['b2', 'b1']
+
+    # Calls of the same lane are rejected, unless the oldest one is discarded
+    assert not submit('n2', NORMAL)
+    executor.rejection_policy = DISCARD_OLDEST
+    assert submit('n2', NORMAL)
+    assert discarded == ['b2', 'b1', 'n1']
+
+    stats = executor.stats()
+    assert (stats[BACKGROUND]['discarded'], stats[BACKGROUND]['rejected']) == (2, 1)
+    assert (stats[NORMAL]['discarded'], stats[NORMAL]['rejected']) == (1, 1)
+    assert executor.queue_depth() == 2
+
+    blocker.released.set()
+
+
+def square(number):
+    return number * number
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='mp_context requires Python 3.7')
+def test_process_pool_does_not_fork(monkeypatch):
+    monkeypatch.setattr(webview.bridge, '_process_pool', None)
+
+    try:
+        future = webview.bridge.run_in_process(square, (3,), lambda future: None)
+        assert future.result(30) == 9
+        assert webview.bridge._process_pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        webview.bridge.shutdown_process_pool()
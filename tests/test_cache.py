@@ -0,0 +1,103 @@
+import webview.cache
+from webview.cache import InstanceCaches, ResultCache, cached
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_order():
+    cache = ResultCache(maxsize=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    assert cache.get('a') == (True, '1')  # a is now the most recently used
+
+    cache.put('c', '3')
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, '1')
+    assert cache.get('c') == (True, '3')
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(webview.cache, 'clock', clock)
+    cache = ResultCache(ttl=10)
+    cache.put('a', '1')
+
+    clock.now = 9.9
+    assert cache.get('a') == (True, '1')
+
+    clock.now = 10.1
+    assert cache.get('a') == (False, None)
+    assert cache.info()['size'] == 0
+
+
+def test_invalidate():
+    cache = ResultCache()
+    cache.put(cache.key({'language': 'en'}), '1')
+    cache.put(cache.key({'language': 'de'}), '2')
+
+    cache.invalidate({'language': 'en'})
+    assert cache.get(cache.key({'language': 'en'})) == (False, None)
+    assert cache.get(cache.key({'language': 'de'})) == (True, '2')
+
+    cache.invalidate()
+    assert cache.info()['size'] == 0
+
+
+def test_counters():
+    cache = ResultCache()
+    cache.get('a')
+    cache.put('a', '1')
+    cache.get('a')
+    cache.get('a')
+
+    info = cache.info()
+    assert (info['hits'], info['misses'], info['size']) == (2, 1, 1)
+
+
+def test_key_ignores_order():
+    assert ResultCache.key({'a': 1, 'b': 2}) == ResultCache.key({'b': 2, 'a': 1})
+
+
+def test_cache_per_instance():
+    class Api(object):
+        def __init__(self, name):
+            self.name = name
+
+        @cached()
+        def whoami(self, params):
+            return self.name
+
+    alice, bob = Api('alice'), Api('bob')
+    caches = Api.whoami.cache
+
+    assert isinstance(caches, InstanceCaches)
+    assert caches.of(alice) is caches.of(alice)
+    assert caches.of(alice) is not caches.of(bob)
+
+    caches.of(alice).put('null', '"alice"')
+    assert caches.of(bob).get('null') == (False, None)
+
+    alice.whoami.cache.invalidate()
+    assert caches.of(alice).get('null') == (False, None)
+    assert caches.info()['instances'] == 2
+
+
+def test_cache_dropped_with_instance():
+    class Api(object):
+        @cached()
+        def f(self, params):
+            pass
+
+    api = Api()
+    Api.f.cache.of(api)
+    del api
+
+    import gc
+    gc.collect()
+    assert Api.f.cache.info()['instances'] == 0
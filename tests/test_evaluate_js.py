@@ -1,4 +1,5 @@
 import threading
+import pytest
 from .util import run_test, destroy_window
 
 
@@ -26,3 +27,160 @@ def evaluate_js():
 
 def test_evaluate_js():
     run_test(evaluate_js)
+
+
+def concurrent_evaluate_js():
+    import webview
+
+    def _evaluate_js(webview, number):
+        results[number] = webview.evaluate_js('({{number: {0}}})'.format(number))
+
+    def _run(webview):
+        threads = [threading.Thread(target=_evaluate_js, args=(webview, i)) for i in range(10)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert results == dict((i, {'number': i}) for i in range(10))
+        destroy_event.set()
+
+    results = {}
+    t = threading.Thread(target=_run, args=(webview,))
+    t.start()
+    destroy_event = destroy_window(webview)
+
+    webview.create_window('Concurrent evaluate JS test', 'https://www.example.org')
+
+
+def test_concurrent_evaluate_js():
+    run_test(concurrent_evaluate_js)
+
+
+class Page(object):
+    """
+    Replaces webview.evaluate_js, recording the evaluated scripts and returning the given results in turn
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.scripts = []
+        self.timeouts = []
+
+    def __call__(self, script, uid='master', timeout=None):
+        self.scripts.append(script)
+        self.timeouts.append(timeout)
+        return self.results.pop(0)
+
+
+def test_batch_js():
+    import json
+    import webview
+
+    scripts = ['1 + 1', 'document.title = "a\'b"', '" </script>"']
+    code = webview._batch_js(scripts)
+
+    assert code.startswith('(function(scripts) {')
+    assert code.endswith('})(' + json.dumps(scripts) + ')')
+    assert '(0, eval)(scripts[i])' in code
+
+
+def test_evaluate_js_many(monkeypatch):
+    import webview
+
+    page = Page('[{"value": 2}, {"error": "ReferenceError: x is not defined"}, {}]')
+    monkeypatch.setattr(webview, 'evaluate_js', page)
+
+    results = webview.evaluate_js_many(['1 + 1', 'x', 'undefined'], 'window', 5)
+
+    assert results[0] == 2
+    assert isinstance(results[1], webview.JavascriptError)
+    assert str(results[1]) == 'ReferenceError: x is not defined'
+    assert results[2] is None
+    assert page.scripts == [webview._batch_js(['1 + 1', 'x', 'undefined'])]
+    assert page.timeouts == [5]
+
+
+def test_evaluate_js_many_closed_window(monkeypatch):
+    import webview
+
+    page = Page(None)
+    monkeypatch.setattr(webview, 'evaluate_js', page)
+
+    assert webview.evaluate_js_many([]) == []
+    assert page.scripts == []
+    assert webview.evaluate_js_many(['1', '2']) == [None, None]
+
+
+def registered_functions(monkeypatch):
+    import webview
+
+    monkeypatch.setattr(webview, '_js_functions', {})
+    monkeypatch.setattr(webview, '_js_functions_revision', 0)
+    webview.register_js('add', 'function(a, b) { return a + b; }')
+    webview.register_js('fail', 'function() { throw new Error("failed"); }')
+
+
+def test_define_js_functions(monkeypatch):
+    import webview
+
+    registered_functions(monkeypatch)
+    code = webview._define_js_functions()
+
+    assert webview._js_functions_revision == 2
+    assert code.startswith('(function() {\nvar functions = {__revision: 2};\n')
+    assert 'functions["add"] = (function(a, b) { return a + b; });\n' in code
+    assert 'functions["fail"] = (function() { throw new Error("failed"); });\n' in code
+    assert code.endswith('window.__pywebviewFunctions = functions;\n})()')
+
+
+def test_call_js(monkeypatch):
+    import webview
+
+    registered_functions(monkeypatch)
+    page = Page('{"value": 3}')
+    monkeypatch.setattr(webview, 'evaluate_js', page)
+
+    assert webview.call_js('add', 1, 2, uid='window') == 3
+    assert page.scripts == [webview._call_js_code % (2, '"add"', '[1, 2]')]
+
+
+def test_call_js_defines_functions(monkeypatch):
+    import webview
+
+    registered_functions(monkeypatch)
+    # The functions in the page are missing or outdated at first
+    page = Page(None, None, '{"value": 3}')
+    monkeypatch.setattr(webview, 'evaluate_js', page)
+
+    assert webview.call_js('add', 1, 2, timeout=5) == 3
+    assert page.scripts[1] == webview._define_js_functions()
+    assert page.scripts[0] == page.scripts[2]
+    assert page.timeouts[0] == 5
+    assert all(timeout <= 5 for timeout in page.timeouts[1:])
+
+    page = Page(None, None, None)
+    monkeypatch.setattr(webview, 'evaluate_js', page)
+
+    with pytest.raises(webview.JavascriptError):
+        webview.call_js('add', 1, 2)
+
+
+def test_call_js_errors(monkeypatch):
+    import webview
+
+    registered_functions(monkeypatch)
+    monkeypatch.setattr(webview, 'evaluate_js', Page('{"error": "Error: failed"}'))
+
+    with pytest.raises(webview.JavascriptError) as error:
+        webview.call_js('fail')
+
+    assert str(error.value) == 'Error: failed'
+
+    with pytest.raises(Exception):
+        webview.call_js('unknown')
+
+    with pytest.raises(TypeError):
+        webview.call_js('add', 1, 2, window='master')
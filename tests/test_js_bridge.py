@@ -22,6 +22,10 @@ class Api:
     def get_string(self, params):
         return 'test'
 
+    def echo(self, params):
+        sleep(params['delay'])
+        return params['value']
+
 
 @pytest.fixture
 def create_api():
@@ -37,6 +41,7 @@ def js_bridge(api):
             assert_js(webview, 'get_int', 5)
             assert_js(webview, 'get_float', 3.141)
             assert_js(webview, 'get_string', 'test')
+            assert_concurrent_calls(webview)
             q.put(0)
         except Exception as e:
             q.put(1)
@@ -53,5 +58,20 @@ def js_bridge(api):
     sys.exit(exitcode)
 
 
+def assert_concurrent_calls(webview):
+    webview.evaluate_js("""
+        window.echoResults = [];
+        window.pywebview.api.echo({ value: 1, delay: 0.5 }).then(function(result) { window.echoResults[0] = result; });
+        window.pywebview.api.echo({ value: 2, delay: 0 }).then(function(result) { window.echoResults[1] = result; });
+    """)
+
+    result = None
+    while result is None:
+        sleep(0.1)
+        result = webview.evaluate_js("window.echoResults.length == 2 ? window.echoResults.join(',') : undefined")
+
+    assert result == '1,2'
+
+
 def test_js_bridge(create_api):
     run_test(js_bridge, create_api)
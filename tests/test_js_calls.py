@@ -0,0 +1,263 @@
+import array
+import sys
+import threading
+import time
+
+import pytest
+
+import webview
+from webview.bridge import Coalescer
+
+from .util import bridge  # noqa: F401
+
+
+class Api(object):
+    def __init__(self):
+        self.calls = []
+
+    def echo(self, params):
+        self.calls.append(params)
+        return params
+
+    @webview.coalesce()
+    def search(self, params):
+        self.calls.append(params)
+        return params
+
+
+def assert_unregistered(bridge):
+    assert bridge.calls == {}
+    assert all(count == 0 for count in bridge._in_flight.values())
+
+
+def test_call_expired_in_queue(bridge):
+    api = Api()
+    webview._dispatch_js_call(bridge, api, 'echo', 1, 'a', timeout=0)
+    bridge.executor.run()
+
+    assert api.calls == []
+    assert bridge.scripts.scripts == []
+    assert_unregistered(bridge)
+
+
+def test_coalesced_call_cancelled_in_queue(bridge):
+    api = Api()
+
+    for call_id in range(1, 4):
+        webview._dispatch_js_call(bridge, api, 'search', call_id, str(call_id))
+
+    bridge.calls[2].cancel()
+    bridge.executor.run()
+
+    assert api.calls == ['3']
+    assert bridge.scripts.named('_supersede') == ['window.pywebview._supersede(1, 3)']
+    assert bridge.scripts.named('_resolve') == ['window.pywebview._resolve(3, "3")']
+    assert_unregistered(bridge)
+
+
+def test_cancelled_call_counts_until_it_returns(bridge):
+    class Slow(object):
+        def wait(self, params):
+            webview._cancel_js_call(bridge, 1)
+            assert bridge.calls[1].cancelled
+            assert bridge._in_flight['wait'] == 1
+            return params
+
+    api = Slow()
+    webview._dispatch_js_call(bridge, api, 'wait', 1, 'a')
+    bridge.executor.run()
+
+    assert bridge.scripts.scripts == []
+    assert_unregistered(bridge)
+
+
+def test_call_cancelled_in_queue(bridge):
+    api = Api()
+    webview._dispatch_js_call(bridge, api, 'echo', 1, 'a')
+    webview._cancel_js_call(bridge, 1)
+
+    assert bridge._in_flight['echo'] == 1
+
+    bridge.executor.run()
+
+    assert api.calls == []
+    assert_unregistered(bridge)
+
+
+def test_cancelled_call_raising(bridge):
+    class Failing(object):
+        def fail(self, params):
+            webview._cancel_js_call(bridge, 1)
+            raise ValueError(params)
+
+    webview._dispatch_js_call(bridge, Failing(), 'fail', 1, 'a')
+    bridge.executor.run()
+
+    assert bridge.scripts.scripts == []
+    assert_unregistered(bridge)
+
+
+def test_coalesced_calls(bridge):
+    api = Api()
+
+    for call_id in range(1, 6):
+        webview._dispatch_js_call(bridge, api, 'search', call_id, str(call_id))
+
+    # The first call scheduled the execution, the others joined it
+    assert len(bridge.executor.queue) == 1
+
+    bridge.executor.run()
+
+    assert api.calls == ['5']
+    assert bridge.scripts.named('_supersede') == ['window.pywebview._supersede({0}, 5)'.format(i) for i in range(1, 5)]
+    assert bridge.scripts.named('_resolve') == ['window.pywebview._resolve(5, "5")']
+    assert_unregistered(bridge)
+
+    webview._dispatch_js_call(bridge, api, 'search', 6, '6')
+    bridge.executor.run()
+    assert api.calls == ['5', '6']
+
+
+class Schedule(object):
+    def __init__(self):
+        self.batches = []
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.batches.append(self.coalescer.take())
+        self.called.set()
+
+
+def test_coalescer_without_delay():
+    schedule = Schedule()
+    coalescer = schedule.coalescer = Coalescer(schedule)
+
+    coalescer.push(1)
+    coalescer.push(2)
+
+    assert schedule.batches == [[1], [2]]
+
+
+def test_coalescer_lone_call_is_not_debounced():
+    # The page has debounced the call already
+    schedule = Schedule()
+    coalescer = schedule.coalescer = Coalescer(schedule, debounce=0.3)
+
+    coalescer.push(1)
+    assert schedule.batches == [[1]]
+
+
+def test_coalescer_debounce():
+    schedule = Schedule()
+    coalescer = schedule.coalescer = Coalescer(schedule, debounce=0.2, throttle=0.1)
+
+    coalescer.push(0)
+    assert schedule.batches == [[0]]
+    schedule.called.clear()
+
+    # Calls delayed by the throttle are debounced
+    for item in range(1, 4):
+        coalescer.push(item)
+        time.sleep(0.05)
+
+    assert schedule.batches == [[0]]
+    assert schedule.called.wait(5)
+    assert schedule.batches == [[0], [1, 2, 3]]
+
+
+def test_coalescer_throttle():
+    schedule = Schedule()
+    coalescer = schedule.coalescer = Coalescer(schedule, throttle=0.2)
+
+    coalescer.push(1)
+    assert schedule.batches == [[1]]
+
+    schedule.called.clear()
+    started = time.time()
+    coalescer.push(2)
+    coalescer.push(3)
+
+    assert schedule.batches == [[1]]
+    assert schedule.called.wait(5)
+    assert time.time() - started >= 0.15
+    assert schedule.batches == [[1], [2, 3]]
+
+
+def test_coalescer_cancel():
+    schedule = Schedule()
+    coalescer = schedule.coalescer = Coalescer(schedule, throttle=0.1)
+
+    coalescer.push(1)
+    schedule.called.clear()
+    coalescer.push(2)
+    coalescer.cancel()
+
+    assert not schedule.called.wait(0.3)
+    assert schedule.batches == [[1]]
+
+
+def binary_result(bridge, result):
+    """
+    :return: bytes received by the page for a function returning result
+    """
+    import base64
+    import json
+
+    class Binary(object):
+        def data(self, params):
+            return result
+
+    bridge.scripts.scripts = []
+    webview._dispatch_js_call(bridge, Binary(), 'data', 1, None)
+    bridge.executor.run()
+
+    assert_unregistered(bridge)
+    opened = bridge.scripts.named('_openBinaryStream')
+    assert len(opened) == 1 and opened[0].startswith('window.pywebview._openBinaryStream(1, ')
+    chunks = [json.loads(code[code.index(', ') + 2:-1]) for code in bridge.scripts.named('_pushStream')]
+    assert bridge.scripts.named('_closeStream') == ['window.pywebview._closeStream(1, null)']
+
+    data = b''.join(base64.b64decode(chunk) for chunk in chunks)
+    assert opened[0] == 'window.pywebview._openBinaryStream(1, {0}, {1})'.format(len(data),
+                                                                                webview.config.js_api_stream_buffer)
+    return data
+
+
+@pytest.mark.skipif(sys.version_info < (3,), reason='bytes are strings in Python 2')
+def test_binary_results(bridge):
+    assert binary_result(bridge, b'abcdef') == b'abcdef'
+    assert binary_result(bridge, bytearray(b'\x00\xff' * 50000)) == b'\x00\xff' * 50000
+    assert binary_result(bridge, b'') == b''
+    assert binary_result(bridge, memoryview(b'abcdef')[::2]) == b'ace'
+    assert binary_result(bridge, memoryview(array.array('H', [1, 2]))) == array.array('H', [1, 2]).tobytes()
+
+
+def test_binary_result_error(bridge, monkeypatch):
+    def _byte_view(data):
+        raise TypeError('unsupported')
+
+    monkeypatch.setattr(webview, '_byte_view', _byte_view)
+    webview._dispatch_js_call(bridge, Api(), 'echo', 1, bytearray(b'a'))
+    bridge.executor.run()
+
+    assert bridge.scripts.scripts == ['window.pywebview._reject(1, {"name": "TypeError", "message": "unsupported"})']
+    assert_unregistered(bridge)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='coroutines see the current call from Python 3.7')
+def test_current_call_in_coroutine(bridge):
+    namespace = {'webview': webview}
+    exec('async def remaining(self, params):\n'
+         '    call = webview.current_call()\n'
+         '    return [call.id, call.remaining() > 0, call.cancelled]\n', namespace)
+    Coroutines = type('Coroutines', (object,), {'remaining': namespace['remaining']})
+
+    webview._dispatch_js_call(bridge, Coroutines(), 'remaining', 1, None, timeout=10)
+
+    deadline = time.time() + 5
+    while not bridge.scripts.named('_resolve') and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert bridge.scripts.named('_resolve') == ['window.pywebview._resolve(1, [1, true, false])']
+    assert webview.current_call() is None
+    assert_unregistered(bridge)
@@ -0,0 +1,88 @@
+import pytest
+
+import webview
+from webview.metrics import BridgeMetrics, Histogram
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+
+    for value in [0, 1, 2, 3, 4, 7, 8, 1000, 2 ** 70]:
+        histogram.add(value)
+
+    # Bucket n holds values from 2^(n-1) to 2^n - 1, the last bucket holds all the larger values
+    assert histogram._buckets[:5] == [1, 1, 2, 2, 1]
+    assert histogram._buckets[10] == 1
+    assert histogram._buckets[63] == 1
+    assert sum(histogram._buckets) == histogram.count == 9
+    assert histogram.max == 2 ** 70
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+
+    for value in range(1, 101):
+        histogram.add(value)
+
+    # Upper bounds of the buckets holding the ranks, capped at the maximum
+    assert histogram.percentile(0.5) == 63
+    assert histogram.percentile(0.9) == 100
+    assert histogram.percentile(0.01) == 1
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 100
+    assert snapshot['sum'] == 5050
+    assert snapshot['mean'] == 50.5
+    assert (snapshot['p50'], snapshot['p90'], snapshot['p99'], snapshot['max']) == (63, 100, 100, 100)
+
+
+def test_histogram_unit():
+    histogram = Histogram(1e-6)
+
+    for _ in range(9):
+        histogram.add(0.0001)  # 100 microseconds
+
+    histogram.add(0.5)
+
+    assert histogram.percentile(0.5) == pytest.approx(127e-6)
+    assert histogram.percentile(1.0) == 0.5
+
+
+def test_metrics_reset():
+    metrics = BridgeMetrics()
+    metrics.record_message(100, 2)
+    metrics.record_start('echo', 0.001)
+    metrics.record_finish('echo', 0.002, 0.0001, 10)
+
+    snapshot = metrics.snapshot(reset=True)
+    assert snapshot['request_bytes']['count'] == 1
+    assert snapshot['methods']['echo']['calls'] == 1
+    assert snapshot['methods']['echo']['response_bytes']['sum'] == 10
+
+    snapshot = metrics.snapshot()
+    assert snapshot['request_bytes']['count'] == 0
+    assert snapshot['methods'] == {}
+
+
+def test_metrics_disabled():
+    metrics = BridgeMetrics(enabled=False)
+    metrics.record_message(100, 2)
+    metrics.record_start('echo')
+
+    assert metrics.snapshot()['request_bytes']['count'] == 0
+    assert metrics.snapshot()['methods'] == {}
+
+
+def test_bridge_stats_reset():
+    webview._create_js_bridge('stats')
+
+    try:
+        bridge = webview._get_bridge('stats')
+        bridge.count_rejection('echo')
+
+        assert webview.bridge_stats('stats', reset=True)['rejected'] == {'echo': 1}
+        assert webview.bridge_stats('stats')['rejected'] == {}
+        assert webview.bridge_stats('unknown') == {}
+    finally:
+        webview._shutdown_js_bridge('stats')
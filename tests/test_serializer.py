@@ -0,0 +1,103 @@
+import datetime
+import decimal
+import enum
+import json
+import sys
+
+import pytest
+
+from webview.serializer import JSONSerializer, OrjsonSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Color(enum.Enum):
+    RED = 'red'
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Point3D(Point):
+    def __init__(self, x, y, z):
+        super(Point3D, self).__init__(x, y)
+        self.z = z
+
+
+def test_builtin_encoders():
+    serializer = JSONSerializer()
+    value = {
+        'datetime': datetime.datetime(2020, 1, 2, 3, 4, 5),
+        'date': datetime.date(2020, 1, 2),
+        'time': datetime.time(3, 4),
+        'decimal': decimal.Decimal('1.5'),
+        'enum': Color.RED,
+    }
+
+    assert json.loads(serializer.dumps(value)) == {'datetime': '2020-01-02T03:04:05', 'date': '2020-01-02',
+                                                   'time': '03:04:00', 'decimal': 1.5, 'enum': 'red'}
+
+
+def test_exact_type_and_mro_lookup():
+    serializer = JSONSerializer()
+    serializer.register(Point, lambda point: [point.x, point.y])
+
+    assert serializer.dumps(Point(1, 2)) == '[1, 2]'
+    # Subclasses use the encoder of their closest registered base class
+    assert serializer.dumps(Point3D(1, 2, 3)) == '[1, 2]'
+
+    serializer.register(Point3D, lambda point: [point.x, point.y, point.z])
+    assert serializer.dumps(Point3D(1, 2, 3)) == '[1, 2, 3]'
+    assert serializer.dumps(Point(1, 2)) == '[1, 2]'
+
+
+def test_encoder_cache():
+    serializer = JSONSerializer()
+
+    with pytest.raises(TypeError):
+        serializer.dumps(Point(1, 2))
+
+    # Unknown types are cached too, registering an encoder invalidates the cache
+    assert serializer._encoder_cache[Point] is None
+
+    serializer.register(Point, lambda point: {'x': point.x})
+    assert serializer._encoder_cache == {}
+    assert serializer.dumps(Point3D(1, 2, 3)) == '{"x": 1}'
+    assert Point3D in serializer._encoder_cache
+
+
+def test_unknown_type():
+    with pytest.raises(TypeError) as error:
+        JSONSerializer().dumps({'point': Point(1, 2)})
+
+    assert 'Point' in str(error.value)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='dataclasses require Python 3.7')
+def test_dataclass():
+    import dataclasses
+
+    Item = dataclasses.make_dataclass('Item', [('name', str), ('count', int)])
+
+    assert json.loads(JSONSerializer().dumps([Item('a', 1)])) == [{'name': 'a', 'count': 1}]
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+def test_orjson_serializer():
+    serializer = OrjsonSerializer()
+    serializer.register(Point, lambda point: [point.x, point.y])
+
+    text = serializer.dumps({'text': u'a\u2028b\u2029c', 'point': Point(1, 2), 'decimal': decimal.Decimal('1.5')})
+
+    assert u'\u2028' not in text and u'\u2029' not in text
+    assert '\\u2028' in text and '\\u2029' in text
+    assert serializer.loads(text) == {'text': u'a\u2028b\u2029c', 'point': [1, 2], 'decimal': 1.5}
+
+    with pytest.raises(TypeError):
+        serializer.dumps(object())
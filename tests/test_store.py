@@ -0,0 +1,131 @@
+import pytest
+
+import webview
+import webview.store
+from webview.store import Store, _apply_patch, _parse_path, update_store
+
+from .util import bridge  # noqa: F401
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+    monkeypatch.setattr(webview.store, '_emit', lambda uid, message: messages.append((uid, message)))
+    return messages
+
+
+@pytest.fixture
+def store():
+    store = Store('todos', {'todos': [{'title': 'a', 'done': False}]}, 'window')
+    yield store
+    store.close()
+
+
+def test_parse_path():
+    assert _parse_path('') == []
+    assert _parse_path('/') == ['']
+    assert _parse_path('/todos/0/done') == ['todos', '0', 'done']
+    assert _parse_path('/a~1b/c~0d/~01') == ['a/b', 'c~d', '~1']
+
+    with pytest.raises(ValueError):
+        _parse_path('todos')
+
+
+def test_apply_patch():
+    document = {'todos': [{'title': 'a'}], 'count': 1}
+    operations = [
+        {'op': 'add', 'path': '/todos/-', 'value': {'title': 'c'}},
+        {'op': 'add', 'path': '/todos/1', 'value': {'title': 'b'}},
+        {'op': 'replace', 'path': '/todos/0/title', 'value': 'A'},
+        {'op': 'replace', 'path': '/count', 'value': 3},
+        {'op': 'remove', 'path': '/todos/2'},
+        {'op': 'add', 'path': '/filter', 'value': None},
+    ]
+
+    assert _apply_patch(document, operations) == operations
+    assert document == {'todos': [{'title': 'A'}, {'title': 'b'}], 'count': 3, 'filter': None}
+
+
+def test_apply_patch_stops_at_invalid_operation():
+    document = {'todos': []}
+    operations = [
+        {'op': 'add', 'path': '/todos/-', 'value': 1},
+        {'op': 'remove', 'path': '/todos/5'},
+        {'op': 'add', 'path': '/todos/-', 'value': 2},
+    ]
+
+    assert _apply_patch(document, operations) == operations[:1]
+    assert document == {'todos': [1]}
+
+    for operation in [{'op': 'replace', 'path': '', 'value': {}},
+                      {'op': 'move', 'path': '/todos/0'},
+                      {'op': 'add', 'path': '/todos/3', 'value': 3},
+                      {'op': 'add', 'path': '/todos/0/x', 'value': 3},
+                      {'op': 'remove', 'path': '/missing'},
+                      {'op': 'add', 'path': '/todos/-1', 'value': 3},
+                      {'op': 'remove', 'path': '/todos/-1'},
+                      {'op': 'replace', 'path': '/todos/-1', 'value': 3},
+                      {'op': 'replace', 'path': '/todos/-', 'value': 3},
+                      {'op': 'replace', 'path': '/todos/1', 'value': 3},
+                      {'op': 'remove', 'path': '/todos/-'},
+                      {'op': 'remove', 'path': '/todos/1'},
+                      {'op': 'replace', 'path': '/todos/01', 'value': 3},
+                      {'op': 'replace', 'path': '/todos/+0', 'value': 3},
+                      {'op': 'add', 'path': '/todos/-1/x', 'value': 3}]:
+        assert _apply_patch(document, [operation]) == []
+
+    assert document == {'todos': [1]}
+
+
+def test_versions(store, sent):
+    store.set('/todos/0/done', True)
+
+    with store.batch():
+        store.append('/todos', {'title': 'b', 'done': False})
+        store.remove('/todos/0')
+
+    store.remove('/missing')
+
+    assert store.version == 2
+    assert [message['version'] for uid, message in sent] == [1, 2]
+    assert sent[0] == ('window', {'name': 'todos', 'version': 1,
+                                  'ops': [{'op': 'replace', 'path': '/todos/0/done', 'value': True}]})
+    assert len(sent[1][1]['ops']) == 2
+    assert store.data == {'todos': [{'title': 'b', 'done': False}]}
+
+
+def test_page_changes_and_resync(store, sent):
+    changes = []
+    store.subscribe(changes.append)
+
+    update_store('window', {'name': 'todos', 'ops': [{'op': 'replace', 'path': '/todos/0/title', 'value': 'b'}]})
+    update_store('window', {'name': 'todos', 'resync': True})
+
+    assert changes == [[{'op': 'replace', 'path': '/todos/0/title', 'value': 'b'}]]
+    assert sent[-1] == ('window', {'name': 'todos', 'version': 1, 'data': store.data})
+
+    # Not shared with the window
+    update_store('other', {'name': 'todos', 'resync': True})
+    update_store('window', {'name': 'unknown', 'resync': True})
+    assert len(sent) == 2
+
+
+def test_page_changes_are_applied_in_order_off_the_gui_thread(store, sent, bridge):
+    for title in ['b', 'c', 'd']:
+        webview._update_js_store(bridge, {'name': 'todos', 'ops': [
+            {'op': 'replace', 'path': '/todos/0/title', 'value': title}]})
+
+    assert store.version == 0
+    assert len(bridge.executor.queue) == 1
+
+    bridge.executor.run()
+
+    assert store.get('/todos/0/title') == 'd'
+    assert [message['ops'][0]['value'] for uid, message in sent] == ['b', 'c', 'd']
+    assert not bridge.store_messages
+
+    # The queue is drained, so the next message is submitted again
+    webview._update_js_store(bridge, {'name': 'todos', 'resync': True})
+    func, args, on_discard = bridge.executor.queue.pop()
+    on_discard()
+    assert not bridge.store_messages
@@ -0,0 +1,72 @@
+import sys
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import webview.bridge
+from webview.bridge import AsyncStream, Stream
+
+from .util import Executor
+
+
+def run_coroutine(coroutine, callback):
+    # Completes the coroutine before the callback is attached, so that concurrent.futures calls the callback on the
+    # calling thread, like when the event loop wins the race in the real run_coroutine
+    import asyncio
+
+    future = Future()
+    loop = asyncio.new_event_loop()
+
+    try:
+        future.set_result(loop.run_until_complete(coroutine))
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        loop.close()
+
+    future.add_done_callback(callback)
+    return future
+
+
+def start_in_thread(stream):
+    thread = threading.Thread(target=stream.start)
+    thread.daemon = True
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), 'the stream is deadlocked'
+
+
+def test_stream():
+    items, closed = [], []
+    stream = Stream(iter(range(5)), 2, Executor(synchronous=True), items.append, closed.append)
+
+    start_in_thread(stream)
+    assert items == [0, 1] and closed == []
+
+    stream.add_credit(10)
+    assert items == [0, 1, 2, 3, 4] and closed == [None]
+
+
+def test_stream_rejected():
+    closed = []
+    stream = Stream(iter(range(5)), 2, Executor(synchronous=True, accept=False), lambda item: None, closed.append)
+
+    start_in_thread(stream)
+    assert len(closed) == 1 and 'discarded' in str(closed[0])
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6), reason='requires asynchronous generators')
+def test_async_stream_completed_synchronously(monkeypatch):
+    namespace = {}
+    exec('async def numbers():\n    for i in range(5):\n        yield i', namespace)
+    monkeypatch.setattr(webview.bridge, 'run_coroutine', run_coroutine)
+
+    items, closed = [], []
+    stream = AsyncStream(namespace['numbers'](), 3, Executor(synchronous=True), items.append, closed.append)
+
+    start_in_thread(stream)
+    assert items == [0, 1, 2] and closed == []
+
+    stream.add_credit(10)
+    assert items == [0, 1, 2, 3, 4] and closed == [None]
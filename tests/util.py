@@ -3,6 +3,8 @@ import time
 import sys
 from multiprocessing import Process
 
+import pytest
+
 
 def destroy_window(webview, delay=0):
     def stop():
@@ -32,11 +34,13 @@ def run_test(test_func, param=None):
 
 
 def assert_js(webview, func_name, expected_result, uid='master'):
-    execute_func = 'window.pywebview.api.{0}()'.format(func_name)
-    check_func =  """
-        var result = window.pywebview._returnValues['{0}']
-        result.value
+    execute_func = """
+        window.testResults = window.testResults || {{}};
+        window.pywebview.api.{0}().then(function(result) {{
+            window.testResults['{0}'] = result;
+        }});
     """.format(func_name)
+    check_func = "window.testResults['{0}']".format(func_name)
 
     webview.evaluate_js(execute_func, uid)
 
@@ -46,4 +50,65 @@ def assert_js(webview, func_name, expected_result, uid='master'):
         time.sleep(0.1)
         result = webview.evaluate_js(check_func, uid)
 
-    assert expected_result == result
\ No newline at end of file
+    assert expected_result == result
+
+
+class Executor(object):
+    """
+    Executor standing in for the one of a bridge. Submitted functions are queued until run() is called, or run right
+    away on the calling thread if synchronous. All of them are rejected if accept is False.
+    """
+
+    def __init__(self, synchronous=False, accept=True):
+        self.synchronous = synchronous
+        self.accept = accept
+        self.queue = []
+
+    def submit(self, func, args=(), on_discard=None, priority=None):
+        if not self.accept:
+            return False
+
+        if self.synchronous:
+            func(*args)
+        else:
+            self.queue.append((func, args, on_discard))
+
+        return True
+
+    def run(self):
+        while self.queue:
+            func, args, on_discard = self.queue.pop(0)
+            func(*args)
+
+
+class Scripts(object):
+    """
+    Script queue recording the scripts instead of evaluating them
+    """
+
+    def __init__(self):
+        self.scripts = []
+
+    def put(self, code, on_delivered=None):
+        self.scripts.append(code)
+
+    def named(self, name):
+        return [code for code in self.scripts if code.startswith('window.pywebview.' + name + '(')]
+
+
+@pytest.fixture
+def bridge():
+    """
+    Bridge of the window 'window' using a queuing Executor and Scripts
+    """
+    import webview
+
+    webview._create_js_bridge('window')
+    bridge = webview._get_bridge('window')
+    executor, scripts = bridge.executor, bridge.scripts
+    bridge.executor, bridge.scripts = Executor(), Scripts()
+
+    yield bridge
+
+    bridge.executor, bridge.scripts = executor, scripts
+    webview._shutdown_js_bridge('window')
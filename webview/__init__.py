@@ -17,11 +17,25 @@ import os
 import sys
 import re
 import json
+import base64
+import inspect
+import itertools
 import logging
-from threading import Event, Thread, current_thread
+from threading import Event, Lock, Thread, current_thread
 from uuid import uuid4
 
 from .localization import localization
+from .serializer import JSONSerializer
+from .cache import cached
+from .store import Store, detach_stores, update_store
+from .bridge import Bridge, Call, Coalescer, Stream, AsyncStream, INTERACTIVE, NORMAL, BACKGROUND, PRIORITIES, clock, \
+    coalesce, cpu_bound, current_call, is_async_generator, is_coroutine, is_coroutine_function, is_cpu_bound, \
+    is_namespace, max_calls, namespace, priority, run_coroutine, run_in_process, set_current_call, shutdown_process_pool
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
@@ -30,12 +44,32 @@ OPEN_DIALOG = 10
 FOLDER_DIALOG = 20
 SAVE_DIALOG = 30
 
+# Binary JS API results are sent to the page in base64 encoded chunks of this size
+_BINARY_CHUNK_SIZE = 512 * 1024
+
+if sys.version < '3':
+    _binary_types = (bytearray, memoryview)
+else:
+    _binary_types = (bytes, bytearray, memoryview)
+
 
 class Config (dict):
 
     def __init__(self):
         self.use_qt = "USE_QT" in os.environ
         self.use_win32 = "USE_WIN32" in os.environ
+        self.js_api_workers = 10
+        self.js_api_queue_size = 1000
+        self.js_api_rejection_policy = 'reject'
+        self.js_api_starvation_limit = 8
+        self.js_api_max_calls = None
+        self.js_api_max_calls_per_function = None
+        self.js_api_metrics = True
+        self.js_event_interval = 0.016
+        self.js_event_animation_frame = True
+        self.js_api_stream_buffer = 16
+        self.js_api_processes = None
+        self.js_api_serializer = JSONSerializer()
 
     def __getitem__(self, key):
         return getattr(self, key.lower())
@@ -44,11 +78,50 @@ class Config (dict):
         setattr(self, key.lower(), value)
 
 
+try:
+    _TimeoutError = TimeoutError
+except NameError:  # Python 2
+    _TimeoutError = Exception
+
+
+class JavascriptTimeoutError(_TimeoutError):
+    """
+    Raised by evaluate_js, if JavaScript code is not evaluated within the given timeout
+    """
+    pass
+
+
+class JavascriptError(Exception):
+    """
+    Error thrown by JavaScript code evaluated by evaluate_js_many. It is returned in place of the result of the code.
+    """
+    pass
+
+
+class JSApiLimitError(Exception):
+    """
+    JS API calls are rejected with this error, if the window or the function has too many calls in progress or the
+    queue of the JS API executor is full. The page receives it as an Error named JSApiLimitError.
+    """
+    pass
+
+
 config = Config()
 
 _initialized = False
 _webview_ready = Event()
 
+_bridges = {}
+_bridges_lock = Lock()
+
+_static_js = {}
+_api_js_cache = {}
+_api_js_lock = Lock()
+
+_js_functions = {}
+_js_functions_revision = 0
+_js_functions_lock = Lock()
+
 
 def _initialize_imports():
     global _initialized, gui
@@ -139,6 +212,20 @@ def create_file_dialog(dialog_type=OPEN_DIALOG, directory='', allow_multiple=Fal
         filetypes = ('Description (*.extension[;*.extension[;...]])', ...)
     :return:
     """
+    directory = _check_file_dialog(directory, file_types)
+
+    try:
+        _webview_ready.wait(5)
+        return gui.create_file_dialog(dialog_type, directory, allow_multiple, save_filename, file_types)
+    except NameError as e:
+        raise Exception("Create a web view window first, before invoking this function")
+
+
+def _check_file_dialog(directory, file_types):
+    """
+    Validate the file types of a file dialog
+    :return: the initial directory, or '' if it does not exist
+    """
     if type(file_types) != tuple and type(file_types) != list:
         raise TypeError('file_types must be a tuple of strings')
     for f in file_types:
@@ -147,11 +234,7 @@ def create_file_dialog(dialog_type=OPEN_DIALOG, directory='', allow_multiple=Fal
     if not os.path.exists(directory):
         directory = ''
 
-    try:
-        _webview_ready.wait(5)
-        return gui.create_file_dialog(dialog_type, directory, allow_multiple, save_filename, file_types)
-    except NameError as e:
-        raise Exception("Create a web view window first, before invoking this function")
+    return directory
 
 
 def load_url(url, uid='master'):
@@ -226,6 +309,10 @@ def create_window(title, url=None, js_api=None, width=800, height=600,
                       width, height, resizable, fullscreen, min_size, confirm_quit,
                       background_color, debug, js_api, _webview_ready)
 
+    if uid == 'master':
+        # The GUI loop of the master window has ended
+        shutdown_process_pool()
+
     return uid
 
 
@@ -284,22 +371,162 @@ def toggle_fullscreen(uid='master'):
         raise Exception('Cannot call function: No webview exists with uid: {}'.format(uid))
 
 
-def evaluate_js(script, uid='master'):
+def evaluate_js(script, uid='master', timeout=None):
     """
     Evaluate given JavaScript code and return the result
     :param script: The JavaScript code to be evaluated
     :param uid: uid of the target instance
+    :param timeout: Number of seconds to wait for the page to load and evaluate the code. JavascriptTimeoutError is
+                    raised if the timeout expires. Default is to wait forever.
     :return: Return value of the evaluated code
     """
     try:
         _webview_ready.wait(5)
-        return gui.evaluate_js(script, uid)
+        return gui.evaluate_js(script, uid, timeout)
+    except NameError:
+        raise Exception('Create a web view window first, before invoking this function')
+    except KeyError:
+        raise Exception('Cannot call function: No webview exists with uid: {}'.format(uid))
+
+
+def evaluate_js_many(scripts, uid='master', timeout=None):
+    """
+    Evaluate a list of JavaScript code snippets in order with a single round trip to the GUI thread
+    :param scripts: list of JavaScript code snippets
+    :param uid: uid of the target instance
+    :param timeout: Number of seconds to wait for the page to load and evaluate the code. JavascriptTimeoutError is
+                    raised if the timeout expires. Default is to wait forever.
+    :return: list of the return values of the snippets converted through JSON. A snippet that throws an error has a
+             JavascriptError in place of its return value.
+    """
+    if not scripts:
+        return []
+
+    result = evaluate_js(_batch_js(scripts), uid, timeout)
+
+    if result is None:
+        # The window has been closed
+        return [None] * len(scripts)
+
+    return [JavascriptError(item['error']) if 'error' in item else item.get('value') for item in json.loads(result)]
+
+
+def register_js(name, source):
+    """
+    Register a JavaScript function, which can be called with call_js. Registered functions are defined in a page with
+    the first call_js after the page is loaded, so calls do not send the source and the engine does not parse it again.
+    :param name: name of the function
+    :param source: JavaScript function expression, e.g. 'function(a, b) { return a + b; }'
+    """
+    global _js_functions_revision
+
+    with _js_functions_lock:
+        _js_functions[name] = source
+        _js_functions_revision += 1
+
+
+def call_js(name, *args, **kwargs):
+    """
+    Call a JavaScript function registered with register_js. Arguments are serialized with config.js_api_serializer.
+    call_js(name, *args, uid='master', timeout=None)
+    :param name: name of the function
+    :param args: JSON serializable arguments of the function
+    :param uid: uid of the target instance
+    :param timeout: Number of seconds to wait for the page to load and call the function. JavascriptTimeoutError is
+                    raised if the timeout expires. Default is to wait forever.
+    :return: return value of the function converted through JSON. JavascriptError is raised, if the function throws.
+    """
+    uid = kwargs.pop('uid', 'master')
+    timeout = kwargs.pop('timeout', None)
+
+    if kwargs:
+        raise TypeError('call_js() got an unexpected keyword argument {0}'.format(list(kwargs)[0]))
+
+    with _js_functions_lock:
+        if name not in _js_functions:
+            raise Exception('JavaScript function {0} is not registered'.format(name))
+
+        revision = _js_functions_revision
+
+    code = _call_js_code % (revision, json.dumps(name), config.js_api_serializer.dumps(list(args)))
+    deadline = _js_deadline(timeout)
+    result = evaluate_js(code, uid, timeout)
+
+    if result is None:
+        # The page has been loaded since the functions were defined, or they have been registered since
+        evaluate_js(_define_js_functions(), uid, _js_remaining(deadline))
+        result = evaluate_js(code, uid, _js_remaining(deadline))
+
+        if result is None:
+            raise JavascriptError('Cannot define JavaScript function {0}'.format(name))
+
+    result = json.loads(result)
+
+    if 'error' in result:
+        raise JavascriptError(result['error'])
+
+    return result.get('value')
+
+
+def evaluate_js_async(script, callback, uid='master'):
+    """
+    Evaluate given JavaScript code without blocking the calling thread
+    :param script: The JavaScript code to be evaluated
+    :param callback: function called with the return value of the code, usually on the GUI thread. It is called with
+                     None, if the window is closed before the code is evaluated.
+    :param uid: uid of the target instance
+    :return: a function discarding the callback, for callers that stop waiting for the result
+    """
+    try:
+        evaluate = getattr(gui, 'evaluate_js_async', None)
     except NameError:
         raise Exception('Create a web view window first, before invoking this function')
+
+    if evaluate is None or not _webview_ready.is_set():
+        # GUI implementations without asynchronous evaluation are served by a thread waiting for the result
+        def _evaluate():
+            try:
+                result = evaluate_js(script, uid)
+            except Exception:
+                logger.exception('Error occurred while evaluating JavaScript code')
+                result = None
+
+            if not discarded.is_set():
+                callback(result)
+
+        discarded = Event()
+        thread = Thread(target=_evaluate)
+        thread.daemon = True
+        thread.start()
+        return discarded.set
+
+    try:
+        return evaluate(script, uid, callback)
     except KeyError:
         raise Exception('Cannot call function: No webview exists with uid: {}'.format(uid))
 
 
+def emit(event, payload=None, uid='master'):
+    """
+    Emit an event to the handlers registered with pywebview.on(event, handler) in the page. Events emitted within
+    config.js_event_interval seconds are delivered to the page together with a single script. Events can be received
+    only in windows created with a js_api object.
+    :param event: name of the event
+    :param payload: JSON serializable data passed to the handlers
+    :param uid: uid of the target instance
+    """
+    bridge = _get_bridge(uid)
+
+    if bridge is None:
+        raise Exception('Cannot call function: No webview exists with uid: {}'.format(uid))
+
+    _emit_js_event(bridge, event, payload)
+
+
+def _emit_js_event(bridge, event, payload):
+    bridge.events.put('[{0},{1}]'.format(json.dumps(event), config.js_api_serializer.dumps(payload)))
+
+
 def window_exists(uid='master'):
     """
     Check whether a webview with the given UID is up and running
@@ -323,43 +550,830 @@ def webview_ready(timeout=None):
 
 
 def _js_bridge_call(uid, api_instance, func_name, param):
+    """
+    Dispatch JS API calls received from the page. The page sends calls made in the same tick as a single batch, i.e.
+    a '_batch' message with a JSON list of {func, id, params, timeout, priority} objects, where the optional timeout is
+    the number of milliseconds the page waits for the result and the optional priority overrides the priority of the
+    function. Besides API calls, a batch may contain '_stream' messages controlling the flow of streams, '_cancel'
+    messages cancelling calls in progress and '_store' messages changing or requesting the data of a Store.
+    :param uid: uid of the window that made the calls
+    :param api_instance: js_api object of the window
+    :param func_name: name of the called function or '_batch'
+    :param param: JSON encoded call or batch of calls
+    """
+    bridge = _get_bridge(uid)
+
+    if bridge is None:
+        # The window has been closed
+        return
+
+    try:
+        message = config.js_api_serializer.loads(param)
+        calls = message if func_name == '_batch' else [dict(message, func=func_name)]
+    except Exception as e:
+        logger.exception('Invalid JS API call of function {0}'.format(func_name))
+        return
+
+    bridge.metrics.record_message(len(param), len(calls))
+
+    for call in calls:
+        if call['func'] == '_stream':
+            _control_js_stream(bridge, call['id'], call['params'])
+        elif call['func'] == '_cancel':
+            _cancel_js_call(bridge, call['id'])
+        elif call['func'] == '_store':
+            _update_js_store(bridge, call['params'])
+        else:
+            timeout = call.get('timeout')
+            timeout = timeout / 1000.0 if timeout is not None else None
+            _dispatch_js_call(bridge, api_instance, call['func'], call['id'], call.get('params'), timeout,
+                              call.get('priority'))
+
+
+def _update_js_store(bridge, message):
+    """
+    Apply a '_store' message on a worker thread rather than the GUI thread. Messages of a window are applied one at a
+    time in the order the page sent them: the queue is drained by a single call while it is not empty.
+    """
+    def _discard():
+        with bridge._calls_lock:
+            discarded = len(bridge.store_messages)
+            bridge.store_messages.clear()
+
+        logger.error('{0} store message(s) of window {1} discarded: the JS API queue is full'.format(discarded, bridge.uid))
+
+    with bridge._calls_lock:
+        bridge.store_messages.append(message)
+
+        if len(bridge.store_messages) > 1:
+            return
+
+    if not bridge.executor.submit(_apply_js_store_messages, (bridge,), _discard):
+        _discard()
+
+
+def _apply_js_store_messages(bridge):
+    while True:
+        with bridge._calls_lock:
+            message = bridge.store_messages[0]
+
+        try:
+            update_store(bridge.uid, message)
+        except Exception:
+            logger.exception('Error occurred while updating store {0}'.format(message.get('name')))
+
+        with bridge._calls_lock:
+            bridge.store_messages.popleft()
+
+            if not bridge.store_messages:
+                return
+
+
+def _dispatch_js_call(bridge, api_instance, func_name, call_id, func_params, timeout=None, priority=None):
     def _call():
-        result = json.dumps(function(func_params))
-        code = 'window.pywebview._returnValues["{0}"] = {{ isSet: true, value: {1}}}'.format(func_name, _escape_line_breaks(result))
-        evaluate_js(code, uid)
+        _execute_js_call(bridge, function, call, func_params, cache, cache_key)
+
+    def _discard():
+        bridge.count_rejection(func_name)
+        _reject_js_call(bridge, call_id, JSApiLimitError('Function {0}() call discarded: the JS API queue is full'.format(func_name)))
+
+    function = _find_api_function(api_instance, func_name)
+    caches = getattr(function, 'cache', None)
+    cache = caches.of(getattr(function, '__self__', None)) if caches is not None else None
+    cache_key = None
+
+    if cache is not None:
+        cache_key = cache.key(func_params)
+        is_cached, result = cache.get(cache_key)
+
+        if is_cached:
+            bridge.metrics.record_start(func_name)
+            _resolve_js_call(bridge, call_id, result)
+            return
+
+    if function is None:
+        logger.error('Function {}() does not exist'.format(func_name))
+        _reject_js_call(bridge, call_id, AttributeError('Function {0}() does not exist'.format(func_name)))
+        return
+
+    if priority not in PRIORITIES:
+        priority = getattr(function, 'priority', NORMAL)
+
+    call = Call(call_id, func_name, timeout, priority)
+
+    if not bridge.add_call(call, getattr(function, 'max_calls', None)):
+        logger.error('Function {0}() call rejected: too many calls in progress'.format(func_name))
+        _reject_js_call(bridge, call_id, JSApiLimitError('Function {0}() call rejected: too many calls in progress'.format(func_name)))
+        return
+
+    if getattr(function, 'coalesce', None) is not None:
+        _coalesce_js_call(bridge, function, call, func_params)
+    elif is_coroutine_function(function) or is_cpu_bound(function):
+        # Coroutines and CPU bound functions do not need a worker thread, they are scheduled on the asyncio event loop
+        # or the process pool right away
+        _call()
+    elif not bridge.executor.submit(_call, on_discard=_discard, priority=priority):
+        logger.error('Function {0}() call rejected: the JS API queue is full'.format(func_name))
+        bridge.count_rejection(func_name)
+        _reject_js_call(bridge, call_id, JSApiLimitError('Function {0}() call rejected: the JS API queue is full'.format(func_name)))
+
+
+def _execute_js_call(bridge, function, call, func_params, cache=None, cache_key=None):
+    if call.cancelled:
+        # Cancelled or expired while queued
+        bridge.pop_call(call.id)
+        return
+
+    call.started = clock()
+    bridge.metrics.record_start(call.func_name, call.started - call.created)
+
+    if is_cpu_bound(function):
+        _execute_js_call_in_process(bridge, function, call, func_params, cache, cache_key)
+        return
+
+    set_current_call(call)
+
+    try:
+        result = function(func_params)
+    except Exception as e:
+        bridge.metrics.record_finish(call.func_name, clock() - call.started, error=True)
+
+        if call.cancelled:
+            bridge.pop_call(call.id)
+        else:
+            logger.exception('Error occurred while evaluating function {0}'.format(call.func_name))
+            _reject_js_call(bridge, call.id, e)
+    else:
+        _return_js_result(bridge, call, result, cache, cache_key)
+    finally:
+        set_current_call(None)
+
+
+def _execute_js_call_in_process(bridge, function, call, func_params, cache=None, cache_key=None):
+    def _on_done(future):
+        if future.cancelled() or call.cancelled:
+            bridge.pop_call(call.id)
+            return
+
+        try:
+            result = future.result()
+        except Exception as e:
+            bridge.metrics.record_finish(call.func_name, clock() - call.started, error=True)
+            logger.exception('Error occurred while evaluating function {0}'.format(call.func_name))
+            _reject_js_call(bridge, call.id, e)
+        else:
+            _return_js_result(bridge, call, result, cache, cache_key)
+
+    try:
+        call.set_future(run_in_process(function, (func_params,), _on_done, config.js_api_processes))
+    except Exception as e:
+        bridge.metrics.record_finish(call.func_name, clock() - call.started, error=True)
+        logger.exception('Cannot run function {0} in a process'.format(call.func_name))
+        _reject_js_call(bridge, call.id, e)
+
+
+def _coalesce_js_call(bridge, function, call, func_params):
+    """
+    Execute a call of a function decorated with coalesce(). Calls queued while a previous call of the function is
+    still pending join it and only the latest one is executed. The page settles the replaced calls with the result of
+    the latest one.
+    """
+    def _run():
+        calls = []
+
+        for c, p in coalescer.take():
+            if c.cancelled:
+                bridge.pop_call(c.id)
+            else:
+                calls.append((c, p))
+
+        if not calls:
+            return
+
+        latest, latest_params = calls[-1]
+
+        for replaced, _ in calls[:-1]:
+            _supersede_js_call(bridge, replaced.id, latest.id)
+
+        _execute_js_call(bridge, function, latest, latest_params)
+
+    def _discard():
+        for c, _ in coalescer.take():
+            bridge.count_rejection(c.func_name)
+            _reject_js_call(bridge, c.id, JSApiLimitError('Function {0}() call discarded: the JS API queue is full'.format(call.func_name)))
+
+    def _schedule():
+        if is_coroutine_function(function) or is_cpu_bound(function):
+            _run()
+        elif not bridge.executor.submit(_run, on_discard=_discard, priority=call.priority):
+            logger.error('Function {0}() call rejected: the JS API queue is full'.format(call.func_name))
+            _discard()
+
+    with bridge._calls_lock:
+        coalescer = bridge.coalescers.get(call.func_name)
+
+        if coalescer is None:
+            settings = function.coalesce
+            coalescer = Coalescer(_schedule, settings['debounce'], settings['throttle'])
+            bridge.coalescers[call.func_name] = coalescer
+
+    coalescer.push((call, func_params))
+
+
+def _supersede_js_call(bridge, call_id, latest_id):
+    bridge.pop_call(call_id)
+    code = 'window.pywebview._supersede({0}, {1})'.format(json.dumps(call_id), json.dumps(latest_id))
+    bridge.scripts.put(code)
+
 
-    function = getattr(api_instance, func_name, None)
+def _return_js_result(bridge, call, result, cache=None, cache_key=None):
+    def _on_done(future):
+        if future.cancelled() or call.cancelled:
+            bridge.pop_call(call.id)
+            return
 
-    if function is not None:
         try:
-            func_params = param if not param else json.loads(param)
-            t = Thread(target=_call)
-            t.start()
+            _return_js_result(bridge, call, future.result(), cache, cache_key)
         except Exception as e:
-            logger.exception('Error occurred while evaluating function {0}'.format(func_name))
+            bridge.metrics.record_finish(call.func_name, clock() - call.started, error=True)
+            logger.exception('Error occurred while evaluating function {0}'.format(call.func_name))
+            _reject_js_call(bridge, call.id, e)
+
+    if call.cancelled:
+        # The page is no longer interested in the result
+        bridge.pop_call(call.id)
+
+        if is_coroutine(result) or inspect.isgenerator(result):
+            result.close()
+        return
+
+    if is_coroutine(result):
+        if call.deadline is not None:
+            result = asyncio.wait_for(result, call.remaining())
+
+        call.set_future(run_coroutine(result, _on_done))
+        return
+
+    executed = clock()
+
+    if inspect.isgenerator(result) or is_async_generator(result):
+        bridge.metrics.record_finish(call.func_name, executed - call.started)
+        _open_js_stream(bridge, call.id, result, priority=call.priority)
+        return
+
+    if isinstance(result, _binary_types):
+        try:
+            view = _byte_view(result)
+        except Exception as e:
+            bridge.metrics.record_finish(call.func_name, executed - call.started, error=True)
+            logger.exception('Cannot send the binary return value of function {0}'.format(call.func_name))
+            _reject_js_call(bridge, call.id, e)
+            return
+
+        bridge.metrics.record_finish(call.func_name, executed - call.started, response_bytes=len(view))
+        _open_js_binary_stream(bridge, call.id, view, call.priority)
+        return
+
+    try:
+        result = config.js_api_serializer.dumps(result)
+    except Exception as e:
+        bridge.metrics.record_finish(call.func_name, executed - call.started, clock() - executed, error=True)
+        logger.exception('Cannot serialize the return value of function {0}'.format(call.func_name))
+        _reject_js_call(bridge, call.id, e)
     else:
-        logger.error('Function {}() does not exist'.format(func_name))
+        serialized = clock()
+        bridge.metrics.record_finish(call.func_name, executed - call.started, serialized - executed, len(result))
+
+        if cache is not None:
+            cache.put(cache_key, result)
+
+        _resolve_js_call(bridge, call.id, result, lambda delivered: bridge.metrics.record_delivery(call.func_name, delivered - serialized))
+
+
+def _resolve_js_call(bridge, call_id, result, on_delivered=None):
+    bridge.pop_call(call_id)
+    code = 'window.pywebview._resolve({0}, {1})'.format(json.dumps(call_id), result)
+    bridge.scripts.put(code, on_delivered)
+
+
+def _open_js_stream(bridge, call_id, iterator, open_code=None, serialize=None, priority=NORMAL):
+    """
+    Stream items produced by a generator to a pending JS API call
+    :param bridge: Bridge of the window
+    :param call_id: id of the JS API call
+    :param iterator: generator or asynchronous generator
+    :param open_code: script that opens the stream in the page. Default opens a stream resolving the call with an async
+                      iterator
+    :param serialize: function converting an item to a JS expression. Default is config.js_api_serializer
+    :param priority: executor lane that runs the generator
+    """
+    def _send(item):
+        code = 'window.pywebview._pushStream({0}, {1})'.format(json.dumps(call_id), serialize(item))
+        bridge.scripts.put(code)
+
+    def _close(error):
+        with bridge._calls_lock:
+            bridge.streams.pop(call_id, None)
+
+        if error is not None:
+            logger.error('Error occurred while streaming results: {0}'.format(error))
+            error = _serialize_js_error(error)
+
+        code = 'window.pywebview._closeStream({0}, {1})'.format(json.dumps(call_id), error or 'null')
+        bridge.scripts.put(code)
+
+    if open_code is None:
+        open_code = 'window.pywebview._openStream({0}, {1})'.format(json.dumps(call_id), config.js_api_stream_buffer)
+
+    if serialize is None:
+        serialize = config.js_api_serializer.dumps
+
+    stream_class = AsyncStream if is_async_generator(iterator) else Stream
+    stream = stream_class(iterator, config.js_api_stream_buffer, bridge.executor, _send, _close, priority)
+    bridge.pop_call(call_id)
+
+    with bridge._calls_lock:
+        bridge.streams[call_id] = stream
+
+    bridge.scripts.put(open_code)
+    stream.start()
+
+
+def _open_js_binary_stream(bridge, call_id, data, priority=NORMAL):
+    """
+    Send binary data to a pending JS API call as a stream of base64 encoded chunks. The page decodes the chunks into a
+    single Uint8Array, which the call is resolved with.
+    """
+    def _chunks():
+        for offset in range(0, length, _BINARY_CHUNK_SIZE):
+            yield base64.b64encode(view[offset:offset + _BINARY_CHUNK_SIZE].tobytes()).decode('ascii')
+
+    view = _byte_view(data)
+    length = len(view)
+    code = 'window.pywebview._openBinaryStream({0}, {1}, {2})'.format(json.dumps(call_id), length,
+                                                                       config.js_api_stream_buffer)
+    _open_js_stream(bridge, call_id, _chunks(), code, lambda chunk: '"' + chunk + '"', priority)
+
+
+def _byte_view(data):
+    # A memoryview of single bytes, so that its length and slices are in bytes
+    view = memoryview(data)
+
+    if sys.version >= '3':
+        # Only C-contiguous views can be cast, others are copied, e.g. slices with a step
+        return view.cast('B') if view.c_contiguous else memoryview(view.tobytes())
+
+    return view if view.itemsize == 1 else memoryview(view.tobytes())
+
+
+def _control_js_stream(bridge, stream_id, message):
+    with bridge._calls_lock:
+        stream = bridge.streams.get(stream_id)
+
+        if stream is not None and message.get('cancel'):
+            bridge.streams.pop(stream_id, None)
+
+    if stream is None:
+        return
+
+    if message.get('cancel'):
+        stream.cancel()
+    else:
+        stream.add_credit(message['credit'])
+
+
+def _cancel_js_call(bridge, call_id):
+    # The call stays registered, and counts towards the limits, until its execution actually ends
+    call = bridge.calls.get(call_id)
+
+    if call is not None:
+        call.cancel()
+
+    # A call returning a generator turns into a stream, which may be already open
+    with bridge._calls_lock:
+        stream = bridge.streams.pop(call_id, None)
+
+    if stream is not None:
+        stream.cancel()
+
+
+def _reject_js_call(bridge, call_id, error):
+    bridge.pop_call(call_id)
+    code = 'window.pywebview._reject({0}, {1})'.format(json.dumps(call_id), _serialize_js_error(error))
+    bridge.scripts.put(code)
+
+
+def _serialize_js_error(error):
+    return json.dumps({'name': type(error).__name__, 'message': str(error)})
+
+
+def _batch_js(scripts):
+    """
+    Combine JavaScript code snippets into a script evaluating them in the global scope and returning a JSON list of
+    {value} or {error} objects
+    """
+    return """(function(scripts) {
+    var results = [];
+
+    for (var i = 0; i < scripts.length; i++) {
+        try {
+            results.push(JSON.stringify({ value: (0, eval)(scripts[i]) }));
+        } catch (e) {
+            results.push(JSON.stringify({ error: String(e) }));
+        }
+    }
+
+    return '[' + results.join(',') + ']';
+})(%s)""" % json.dumps(list(scripts))
+
+
+# Calls a function defined by _define_js_functions, if the functions in the page are up to date. Returns null otherwise.
+_call_js_code = """(function(functions) {
+    if (!functions || functions.__revision !== %d) {
+        return null;
+    }
+
+    try {
+        return JSON.stringify({ value: functions[%s].apply(null, %s) });
+    } catch (e) {
+        return JSON.stringify({ error: String(e) });
+    }
+})(window.__pywebviewFunctions)"""
+
+
+def _define_js_functions():
+    with _js_functions_lock:
+        definitions = ''.join('functions[{0}] = ({1});\n'.format(json.dumps(name), source)
+                              for name, source in _js_functions.items())
+
+        return '(function() {{\nvar functions = {{__revision: {0}}};\n{1}window.__pywebviewFunctions = functions;\n}})()'.format(
+            _js_functions_revision, definitions)
+
+
+def _js_deadline(timeout):
+    return clock() + timeout if timeout is not None else None
+
+
+def _js_remaining(deadline):
+    return max(deadline - clock(), 0) if deadline is not None else None
+
+
+def _wait_js(event, deadline):
+    """
+    Wait for an event set by the GUI thread in the course of evaluating JavaScript code
+    :param event: threading.Event to wait for
+    :param deadline: value of clock() after which JavascriptTimeoutError is raised. None means wait forever.
+    """
+    if not event.wait(_js_remaining(deadline)):
+        raise JavascriptTimeoutError('JavaScript code was not evaluated in time')
+
+
+class _JSEvaluator(object):
+    """
+    Asynchronous evaluation of JavaScript code in a window, shared by GUI implementations. Code is evaluated on the
+    GUI thread once the page is loaded and the result is passed to a callback. Callbacks still pending when the window
+    is closed receive None.
+    """
+
+    def __init__(self, schedule, load_event):
+        """
+        :param schedule: function running a function on the GUI thread without waiting for it
+        :param load_event: threading.Event set while the page is loaded
+        """
+        self.load_event = load_event
+        self._schedule = schedule
+        self._deferred = []
+        self._callbacks = {}
+        self._tokens = itertools.count()
+        self._lock = Lock()
+
+    def evaluate(self, evaluate, callback):
+        """
+        Evaluate JavaScript code without blocking
+        :param evaluate: function evaluating the code on the GUI thread and returning the result
+        :param callback: function called with the result on the GUI thread
+        :return: a token identifying the evaluation
+        """
+        def _start(token):
+            try:
+                result = evaluate()
+            except Exception:
+                logger.exception('Error occurred while evaluating JavaScript code')
+                result = None
+
+            self.complete(token, result)
+
+        return self.start(_start, callback)
+
+    def start(self, start, callback):
+        """
+        Evaluate JavaScript code, whose result is delivered asynchronously by the web engine
+        :param start: function starting the evaluation on the GUI thread. It receives an integer token, which must be
+                      passed to complete() along with the result.
+        :param callback: function called with the result
+        :return: the token
+        """
+        with self._lock:
+            token = next(self._tokens)
+            self._callbacks[token] = callback
+
+            if not self.load_event.is_set():
+                self._deferred.append(lambda: start(token))
+                return token
+
+        self._schedule(lambda: start(token))
+        return token
+
+    def discard(self, token):
+        """
+        Drop the callback of an evaluation, whose result is no longer awaited
+        """
+        with self._lock:
+            self._callbacks.pop(token, None)
+
+    def complete(self, token, result):
+        with self._lock:
+            callback = self._callbacks.pop(token, None)
+
+        if callback is not None:
+            callback(result)
+
+    def wait(self, evaluate, timeout=None):
+        """
+        Evaluate JavaScript code and wait for the result
+        :param timeout: number of seconds after which JavascriptTimeoutError is raised. Default is to wait forever.
+        """
+        return self._wait(self.evaluate, evaluate, timeout)
+
+    def wait_start(self, start, timeout=None):
+        """
+        Like wait(), for code evaluated with start()
+        """
+        return self._wait(self.start, start, timeout)
+
+    def loaded(self):
+        """
+        Mark the page loaded and evaluate the code deferred until then. Must be called on the GUI thread.
+        """
+        with self._lock:
+            self.load_event.set()
+            deferred, self._deferred = self._deferred, []
+
+        for start in deferred:
+            start()
+
+    def close(self):
+        with self._lock:
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+            self._deferred = []
+
+        for callback in callbacks:
+            callback(None)
+
+    def _wait(self, submit, func, timeout):
+        def _on_result(value):
+            result.append(value)
+            result_event.set()
+
+        result = []
+        result_event = Event()
+        deadline = _js_deadline(timeout)
+        token = submit(func, _on_result)
+
+        try:
+            _wait_js(result_event, deadline)
+        except JavascriptTimeoutError:
+            self.discard(token)
+            raise
+
+        return result[0]
+
+
+def bridge_stats(uid=None, reset=False):
+    """
+    Get metrics of the JS API traffic. Times are in seconds and sizes in bytes. Distributions are summarized as dicts
+    with count, sum, mean, max and estimated p50, p90 and p99 values.
+    :param uid: uid of the window. If omitted, metrics of all the windows are returned in a dict keyed by uid.
+    :param reset: reset the metrics after taking the snapshot
+    :return: a dict with request_bytes and calls_per_message of the messages sent by the page, evaluation time and
+             scripts_per_evaluation of the results delivered to the page, queue_depth and lanes of the executor,
+             in_flight, the number of calls in progress, rejected, a dict of the numbers of calls rejected per function
+             by the limits of the bridge, and
+             methods, a dict of per-function metrics: calls, errors, queued, executing, serialization and delivery
+             time and response_bytes
+    """
+    with _bridges_lock:
+        bridges = dict(_bridges)
+
+    if uid is not None:
+        bridges = {uid: bridges[uid]} if uid in bridges else {}
+
+    stats = {}
+
+    for bridge_uid, bridge in bridges.items():
+        stats[bridge_uid] = bridge.metrics.snapshot(reset)
+        stats[bridge_uid]['queue_depth'] = bridge.executor.queue_depth()
+        stats[bridge_uid]['lanes'] = bridge.executor.stats()
+
+        with bridge._calls_lock:
+            stats[bridge_uid]['in_flight'] = len(bridge.calls)
+            stats[bridge_uid]['rejected'] = dict(bridge.rejected)
+
+            if reset:
+                bridge.rejected.clear()
+
+        if reset:
+            bridge.executor.reset_stats()
+
+    return stats.get(uid, {}) if uid is not None else stats
+
+
+def _get_bridge(uid):
+    """
+    :return: the Bridge of a window or None, if the window does not exist or has been closed
+    """
+    with _bridges_lock:
+        return _bridges.get(uid)
+
+
+def _create_js_bridge(uid):
+    """
+    Start the threads executing JS API calls of a window and delivering their results. Must be invoked by a GUI
+    implementation when a window is created.
+    :param uid: uid of the created window
+    """
+    bridge = Bridge(uid, lambda script: evaluate_js(script, uid), config)
+
+    with _bridges_lock:
+        previous = _bridges.get(uid)
+        _bridges[uid] = bridge
+
+    if previous is not None:
+        previous.shutdown()
+
+
+def _shutdown_js_bridge(uid):
+    """
+    Stop the threads executing JS API calls of a window and delivering their results. Must be invoked by a GUI
+    implementation when a window is closed.
+    :param uid: uid of the closed window
+    """
+    with _bridges_lock:
+        bridge = _bridges.pop(uid, None)
+
+    if bridge is not None:
+        bridge.shutdown()
+
+    detach_stores(uid)
+
+
+def invalidate_js_api(js_api=None):
+    """
+    The JavaScript code exposing a js_api object to the page is generated once per API class and set of functions and
+    namespaces assigned to instance attributes. Call this function after adding functions to an API class or object at
+    runtime, so that the pages loaded afterwards can call them.
+    :param js_api: API object or class to invalidate. If omitted, code of all the API classes is invalidated.
+    """
+    with _api_js_lock:
+        if js_api is None:
+            _api_js_cache.clear()
+        else:
+            api_class = js_api if isinstance(js_api, type) else js_api.__class__
+
+            for key in [key for key in _api_js_cache if key[0] is api_class]:
+                del _api_js_cache[key]
 
 
 def _parse_api_js(api_instance):
-    base_dir = os.path.dirname(os.path.realpath(__file__))
+    key = _api_key(api_instance, set())
 
-    with open(os.path.join(base_dir, 'js', 'npo.js')) as npo_js:
-        js_code = npo_js.read()
+    with _api_js_lock:
+        js_code = _api_js_cache.get(key)
 
-    with open(os.path.join(base_dir, 'js', 'api.js')) as api_js:
-        func_list = [str(f) for f in dir(api_instance) if callable(getattr(api_instance, f)) and str(f)[0] != '_']
-        js_code += api_js.read() % func_list
+        if js_code is None:
+            coalesced = {}
+            api_tree = _api_tree(api_instance, '', coalesced, set())
+            js_code = _read_js('npo.js') + _read_js('api.js') % (json.dumps(api_tree), json.dumps(coalesced))
+            _api_js_cache[key] = js_code
 
     return js_code
 
 
-def _escape_string(string):
-    return string.replace('"', r'\"').replace('\n', r'\n').replace('\r', r'\\r')
+def _api_key(obj, ancestors):
+    """
+    Key of the generated JavaScript code of an API object. Functions defined by the class are the same for all of its
+    instances, but functions and namespaces assigned to instance attributes are not, so they are part of the key.
+    :param obj: API object or namespace
+    :param ancestors: ids of the namespaces enclosing obj, to stop at reference cycles
+    :return: a hashable tuple starting with the class of obj
+    """
+    key = [obj.__class__]
+    members = getattr(obj, '__dict__', None) or {}
+    ancestors.add(id(obj))
+
+    for name in sorted(members):
+        if not _is_api_member(obj, name):
+            continue
+
+        member = members[name]
+
+        if callable(member):
+            coalesce = getattr(member, 'coalesce', None)
+            key.append((name, tuple(sorted(_coalesce_settings(member).items())) if coalesce is not None else None))
+        elif is_namespace(member) and id(member) not in ancestors:
+            key.append((name, _api_key(member, ancestors)))
+
+    ancestors.discard(id(obj))
+    return tuple(key)
+
+
+def _api_tree(obj, prefix, coalesced, ancestors):
+    """
+    Describe the functions and namespaces of an API object. The page creates stubs of the functions lazily from the
+    description.
+    :param obj: API object or namespace
+    :param prefix: dotted path of the namespace
+    :param coalesced: dict collecting coalescing settings of functions by their dotted path
+    :param ancestors: ids of the namespaces enclosing obj, to stop at reference cycles
+    :return: a dict of function names mapped to True and namespace names mapped to their descriptions
+    """
+    tree = {}
+    ancestors.add(id(obj))
+
+    for name in dir(obj):
+        if not _is_api_member(obj, name):
+            continue
+
+        member = getattr(obj, name, None)
+        name = str(name)
+
+        if callable(member):
+            tree[name] = True
+
+            if getattr(member, 'coalesce', None) is not None:
+                coalesced[prefix + name] = _coalesce_settings(member)
+        elif is_namespace(member) and id(member) not in ancestors:
+            tree[name] = _api_tree(member, prefix + name + '.', coalesced, ancestors)
+
+    ancestors.discard(id(obj))
+    return tree
+
+
+def _is_api_member(obj, name):
+    if name.startswith('_'):
+        return False
+
+    # Do not evaluate properties, they may have side effects
+    return not isinstance(getattr(obj.__class__, name, None), property)
+
+
+def _find_api_function(api_instance, func_name):
+    """
+    Find a function of the API by its name, which is a dotted path for functions of nested namespaces
+    :return: the function or None if the name does not refer to a public function
+    """
+    obj = api_instance
+    names = func_name.split('.')
+
+    for name in names[:-1]:
+        if not _is_api_member(obj, name):
+            return None
+
+        obj = getattr(obj, name, None)
+
+        if not is_namespace(obj):
+            return None
+
+    if not _is_api_member(obj, names[-1]):
+        return None
+
+    function = getattr(obj, names[-1], None)
+    return function if callable(function) else None
+
+
+def _coalesce_settings(function):
+    # Coalescing windows of the page in milliseconds
+    return dict((key, int(value * 1000) if value else 0) for key, value in function.coalesce.items())
 
 
-def _escape_line_breaks(string):
-    return string.replace('\\n', r'\\n').replace('\\r', r'\\r')
+def _read_js(file_name):
+    """
+    Read a JavaScript file from the js directory. The contents are read once and cached for the lifetime of the process.
+    """
+    js_code = _static_js.get(file_name)
+
+    if js_code is None:
+        with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'js', file_name)) as f:
+            js_code = f.read()
+
+        _static_js[file_name] = js_code
+
+    return js_code
+
+
+def _escape_string(string):
+    return string.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n').replace('\r', r'\r')
 
 
 def _make_unicode(string):
@@ -0,0 +1,163 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+
+Counterparts of the functions of the webview module for asyncio applications (Python 3.5+). The functions do not
+block the event loop. They return asyncio futures and must be called from the thread running the event loop. The
+futures are completed from the GUI thread, so no thread waits per outstanding operation. With GUI implementations that
+cannot schedule functions on the GUI thread (Win32), the blocking functions run in the default executor instead.
+
+    import webview.aio
+
+    async def refresh():
+        count = await webview.aio.evaluate_js('document.querySelectorAll("li").length')
+"""
+
+import asyncio
+import functools
+
+import webview
+from webview import OPEN_DIALOG, JavascriptTimeoutError
+
+
+def evaluate_js(script, uid='master', timeout=None):
+    """
+    Evaluate given JavaScript code. With GUI implementations that evaluate code asynchronously, the future is completed
+    from the GUI thread and no thread waits for the result.
+    :param script: The JavaScript code to be evaluated
+    :param uid: uid of the target instance
+    :param timeout: Number of seconds after which the future fails with JavascriptTimeoutError. Default is to wait
+                    forever.
+    :return: future of the return value of the code
+    """
+    loop = asyncio.get_event_loop()
+
+    if getattr(getattr(webview, 'gui', None), 'evaluate_js_async', None) is None or \
+            not webview._webview_ready.is_set():
+        return _run(webview.evaluate_js, script, uid, timeout)
+
+    future = loop.create_future()
+    discard = webview.evaluate_js_async(script, lambda result: _complete(loop, future, result), uid)
+
+    if timeout is not None:
+        def _timeout():
+            discard()
+            _set_exception(future, JavascriptTimeoutError('JavaScript code was not evaluated in time'))
+
+        handle = loop.call_later(timeout, _timeout)
+        future.add_done_callback(lambda f: handle.cancel())
+
+    return future
+
+
+def create_file_dialog(dialog_type=OPEN_DIALOG, directory='', allow_multiple=False, save_filename='', file_types=()):
+    if not _gui_thread_supported():
+        return _run(webview.create_file_dialog, dialog_type, directory, allow_multiple, save_filename, file_types)
+
+    directory = webview._check_file_dialog(directory, file_types)
+    return _call('create_file_dialog', None, dialog_type, directory, allow_multiple, save_filename, file_types)
+
+
+def load_url(url, uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.load_url, url, uid)
+
+    return _call('load_url', uid, url, uid)
+
+
+def load_html(content, base_uri='', uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.load_html, content, base_uri, uid)
+
+    return _call('load_html', uid, webview._make_unicode(content), base_uri, uid)
+
+
+def set_title(title, uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.set_title, title, uid)
+
+    return _call('set_title', uid, title, uid)
+
+
+def get_current_url(uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.get_current_url, uid)
+
+    return _call('get_current_url', uid, uid)
+
+
+def destroy_window(uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.destroy_window, uid)
+
+    return _call('destroy_window', uid, uid)
+
+
+def toggle_fullscreen(uid='master'):
+    if not _gui_thread_supported():
+        return _run(webview.toggle_fullscreen, uid)
+
+    return _call('toggle_fullscreen', uid, uid)
+
+
+def _gui_thread_supported():
+    # The GUI implementation must be able to run a function on the GUI thread without waiting for it
+    return getattr(getattr(webview, 'gui', None), 'schedule', None) is not None and webview._webview_ready.is_set()
+
+
+def _call(name, uid, *args):
+    """
+    Call a function of the GUI implementation on the GUI thread and complete the future with its result from there
+    :param name: name of the function
+    :param uid: uid of the window, whose GUI thread calls the function. None for any window.
+    :param args: arguments of the function
+    :return: future of the return value of the function
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+    func = getattr(webview.gui, name)
+
+    def _on_gui_thread():
+        try:
+            result = func(*args)
+        except KeyError:
+            _complete(loop, future, exception=Exception('Cannot call function: No webview exists with uid: {}'.format(uid)))
+        except Exception as e:
+            _complete(loop, future, exception=e)
+        else:
+            _complete(loop, future, result)
+
+    try:
+        webview.gui.schedule(_on_gui_thread, uid)
+    except (KeyError, IndexError):
+        raise Exception('Cannot call function: No webview exists with uid: {}'.format(uid))
+
+    return future
+
+
+def _run(func, *args):
+    # The blocking function occupies a thread of the default executor until the GUI thread has carried it out
+    return asyncio.get_event_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+def _complete(loop, future, result=None, exception=None):
+    try:
+        if exception is None:
+            loop.call_soon_threadsafe(_set_result, future, result)
+        else:
+            loop.call_soon_threadsafe(_set_exception, future, exception)
+    except RuntimeError:
+        # The event loop has been closed
+        pass
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
@@ -0,0 +1,1050 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+"""
+
+import inspect
+import logging
+import time
+from collections import deque
+from threading import Condition, Event, Lock, Thread, Timer, current_thread, local
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ProcessPoolExecutor = None
+
+try:
+    import contextvars
+except ImportError:  # Python 3.6 and older
+    contextvars = None
+
+from .metrics import BridgeMetrics
+
+
+logger = logging.getLogger(__name__)
+
+REJECT = 'reject'
+DISCARD_OLDEST = 'discard_oldest'
+
+INTERACTIVE = 'interactive'
+NORMAL = 'normal'
+BACKGROUND = 'background'
+
+# Priority lanes of the executor, the most urgent first
+PRIORITIES = (INTERACTIVE, NORMAL, BACKGROUND)
+
+# Python 3.4 has asyncio, but neither async def coroutines nor asyncio.run_coroutine_threadsafe in all its releases
+_coroutines_supported = asyncio is not None and hasattr(inspect, 'iscoroutinefunction') and \
+    hasattr(asyncio, 'run_coroutine_threadsafe')
+
+_event_loop = None
+_event_loop_lock = Lock()
+
+_process_pool = None
+_process_pool_lock = Lock()
+
+_local = local()
+
+# Tasks running coroutines copy the context of the thread that schedules them, so coroutines see the call as well
+_current_call = contextvars.ContextVar('pywebview_current_call', default=None) if contextvars is not None else None
+
+# Monotonic clock used for deadlines
+clock = getattr(time, 'monotonic', time.time)
+
+
+class BridgeExecutor(object):
+    """
+    A bounded thread pool that executes JS API calls. Worker threads are started on demand up to max_workers and
+    pending calls are kept in a queue of at most queue_size items. When the queue is full, the rejection policy
+    decides what happens to a new call: REJECT drops the new call, DISCARD_OLDEST drops the oldest pending call to make
+    room for the new one.
+
+    Pending calls are queued in priority lanes. Workers serve the INTERACTIVE lane first, then NORMAL and BACKGROUND.
+    A lane passed over starvation_limit times in a row is served next, so that a constant load of urgent calls does not
+    stall the other lanes. One worker is reserved for the INTERACTIVE lane, and a full queue makes room for a call by
+    dropping the newest call of a less urgent lane first.
+    """
+
+    def __init__(self, name, max_workers=10, queue_size=1000, rejection_policy=REJECT, starvation_limit=8):
+        if max_workers < 1:
+            raise ValueError('max_workers must be greater than zero')
+
+        if rejection_policy not in (REJECT, DISCARD_OLDEST):
+            raise ValueError('{0} is not a valid rejection policy'.format(rejection_policy))
+
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.rejection_policy = rejection_policy
+        self.starvation_limit = starvation_limit
+
+        self._lanes = dict((lane, deque()) for lane in PRIORITIES)
+        self._lane_stats = dict((lane, LaneStats()) for lane in PRIORITIES)
+        self._skipped = dict((lane, 0) for lane in PRIORITIES)
+        self._running = dict((lane, 0) for lane in PRIORITIES)
+        self._size = 0
+        self._condition = Condition()
+        self._workers = []
+        self._idle_workers = 0
+        self._is_shutdown = False
+
+    def submit(self, func, args=(), on_discard=None, priority=NORMAL):
+        """
+        Schedule func(*args) for execution on a worker thread.
+        :param func: function to execute
+        :param args: a tuple of arguments passed to the function
+        :param on_discard: optional function called without arguments, if the call is dropped from the queue before
+                           it is executed
+        :param priority: lane of the call, one of INTERACTIVE, NORMAL or BACKGROUND
+        :return: True if the call was queued, False if it was rejected
+        """
+        discarded = None
+
+        with self._condition:
+            stats = self._lane_stats[priority]
+
+            if self._is_shutdown:
+                stats.rejected += 1
+                return False
+
+            if self.queue_size and self._size >= self.queue_size:
+                discarded = self._make_room(priority)
+
+                if discarded is None:
+                    stats.rejected += 1
+                    return False
+
+            self._lanes[priority].append((func, args, on_discard, clock()))
+            self._size += 1
+            stats.submitted += 1
+
+            if self._idle_workers == 0 and len(self._workers) < self.max_workers:
+                self._start_worker()
+            else:
+                self._condition.notify()
+
+        if discarded:
+            self._discard(discarded)
+
+        return True
+
+    def queue_depth(self, priority=None):
+        with self._condition:
+            return self._size if priority is None else len(self._lanes[priority])
+
+    def stats(self):
+        """
+        :return: a dict of lane names to dicts of counters: submitted, rejected, discarded and completed calls, number
+                 of queued and running calls, total and maximum number of seconds calls waited in the queue
+        """
+        with self._condition:
+            return dict((lane, self._lane_stats[lane].snapshot(len(self._lanes[lane]), self._running[lane]))
+                        for lane in PRIORITIES)
+
+    def reset_stats(self):
+        with self._condition:
+            for lane in PRIORITIES:
+                self._lane_stats[lane] = LaneStats()
+
+    def shutdown(self, wait=False):
+        """
+        Stop accepting new calls, drop the pending ones and let the worker threads exit once they finish their
+        current call.
+        :param wait: block until all the worker threads exit
+        """
+        with self._condition:
+            self._is_shutdown = True
+            pending = []
+
+            for lane in PRIORITIES:
+                pending.extend(self._lanes[lane])
+                self._lanes[lane].clear()
+
+            self._size = 0
+            workers = list(self._workers)
+            self._condition.notify_all()
+
+        for item in pending:
+            self._discard(item)
+
+        if wait:
+            for worker in workers:
+                if worker is not current_thread():
+                    worker.join()
+
+    def _make_room(self, priority):
+        # Drop the newest call of the least urgent lane that is less urgent than the new call
+        for lane in reversed(PRIORITIES[PRIORITIES.index(priority) + 1:]):
+            if self._lanes[lane]:
+                return self._drop(lane, self._lanes[lane].pop)
+
+        if self.rejection_policy == DISCARD_OLDEST and self._lanes[priority]:
+            return self._drop(priority, self._lanes[priority].popleft)
+
+        return None
+
+    def _drop(self, lane, pop):
+        self._size -= 1
+        self._lane_stats[lane].discarded += 1
+        return pop()
+
+    def _is_runnable(self, lane):
+        if not self._lanes[lane]:
+            return False
+
+        if lane == INTERACTIVE or self.max_workers == 1:
+            return True
+
+        # Keep a worker free for interactive calls
+        return sum(self._running[other] for other in PRIORITIES if other != INTERACTIVE) < self.max_workers - 1
+
+    def _next_lane(self):
+        runnable = [lane for lane in PRIORITIES if self._is_runnable(lane)]
+
+        if not runnable:
+            return None
+
+        lane = runnable[0]
+
+        for other in runnable[1:]:
+            if self._skipped[other] >= self.starvation_limit:
+                lane = other
+                break
+
+        for other in runnable:
+            self._skipped[other] = 0 if other == lane else self._skipped[other] + 1
+
+        return lane
+
+    def _start_worker(self):
+        worker = Thread(target=self._work, name='{0}-{1}'.format(self.name, len(self._workers) + 1))
+        worker.daemon = True
+        self._workers.append(worker)
+        worker.start()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                lane = self._next_lane()
+
+                while lane is None and not self._is_shutdown:
+                    self._idle_workers += 1
+                    self._condition.wait()
+                    self._idle_workers -= 1
+                    lane = self._next_lane()
+
+                if self._is_shutdown:
+                    self._workers.remove(current_thread())
+                    return
+
+                func, args, _, queued_at = self._lanes[lane].popleft()
+                self._size -= 1
+                self._running[lane] += 1
+                self._lane_stats[lane].add_wait(clock() - queued_at)
+
+            try:
+                func(*args)
+            except Exception:
+                logger.exception('Unhandled exception in {0}'.format(current_thread().name))
+            finally:
+                with self._condition:
+                    self._running[lane] -= 1
+                    self._lane_stats[lane].completed += 1
+
+                    if lane != INTERACTIVE:
+                        # A worker held back by the interactive reservation may proceed
+                        self._condition.notify()
+
+    @staticmethod
+    def _discard(item):
+        on_discard = item[2]
+
+        if on_discard is not None:
+            try:
+                on_discard()
+            except Exception:
+                logger.exception('Error occurred while discarding a JS API call')
+
+
+class LaneStats(object):
+    """
+    Counters of a priority lane of BridgeExecutor
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.completed = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def add_wait(self, wait_time):
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def snapshot(self, queued, running):
+        return {'submitted': self.submitted, 'rejected': self.rejected, 'discarded': self.discarded,
+                'completed': self.completed, 'queued': queued, 'running': running,
+                'wait_time': self.wait_time, 'max_wait_time': self.max_wait_time}
+
+
+class ScriptQueue(object):
+    """
+    Delivers scripts, such as results of JS API calls, to a window from a single dedicated thread, so that neither the
+    GUI thread nor the worker threads have to wait for the page to evaluate them. Scripts queued while a delivery is in
+    progress are joined and evaluated together in the next one.
+    """
+
+    def __init__(self, name, deliver, metrics=None):
+        """
+        :param name: name of the delivering thread
+        :param deliver: function evaluating a script in the window
+        :param metrics: optional BridgeMetrics recording the duration of deliveries
+        """
+        self.name = name
+        self._deliver = deliver
+        self._metrics = metrics
+        self._queue = deque()
+        self._condition = Condition()
+        self._thread = None
+        self._is_closed = False
+
+    def put(self, script, on_delivered=None):
+        """
+        Queue a script for delivery
+        :param script: JavaScript code
+        :param on_delivered: optional function called with the time of clock() when the script has been evaluated
+        """
+        with self._condition:
+            if self._is_closed:
+                return
+
+            self._queue.append((script, on_delivered))
+
+            if self._thread is None:
+                self._thread = Thread(target=self._work, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+            else:
+                self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._is_closed = True
+            self._queue.clear()
+            self._condition.notify()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._is_closed:
+                    self._condition.wait()
+
+                if self._is_closed:
+                    return
+
+                items = list(self._queue)
+                self._queue.clear()
+
+            started = clock()
+
+            try:
+                self._deliver(';\n'.join(script for script, _ in items))
+            except Exception:
+                logger.exception('Error occurred while delivering a script to the window')
+                continue
+
+            delivered = clock()
+
+            if self._metrics is not None:
+                self._metrics.record_evaluation(delivered - started, len(items))
+
+            for _, on_delivered in items:
+                if on_delivered is not None:
+                    on_delivered(delivered)
+
+
+class Stream(object):
+    """
+    Feeds items produced by a generator to the page. At most `credit` items are sent ahead of the page, which grants
+    more credit as it consumes them. Once the credit is used up, the generator is parked without occupying a worker
+    thread until more credit arrives.
+    """
+
+    def __init__(self, iterator, credit, executor, send, close, priority=NORMAL):
+        """
+        :param iterator: generator producing the items
+        :param credit: number of items that can be sent before the page acknowledges them
+        :param executor: BridgeExecutor that runs the generator
+        :param send: function called with each produced item
+        :param close: function called with None when the generator is exhausted or with an exception if it fails
+        :param priority: executor lane that runs the generator
+        """
+        self._iterator = iterator
+        self._priority = priority
+        self._credit = credit
+        self._executor = executor
+        self._send = send
+        self._close = close
+        self._lock = Lock()
+        self._is_running = False
+        self._is_closed = False
+
+    def start(self):
+        self._schedule()
+
+    def add_credit(self, credit):
+        with self._lock:
+            self._credit += credit
+
+        self._schedule()
+
+    def cancel(self):
+        with self._lock:
+            if self._is_closed:
+                return
+
+            self._is_closed = True
+
+            # A running generator is closed by the thread that runs it
+            if self._is_running:
+                return
+
+        self._close_iterator()
+
+    def _schedule(self):
+        with self._lock:
+            if self._is_running or self._is_closed or self._credit <= 0:
+                return
+
+            self._is_running = True
+
+        # Started without holding the lock, since the callbacks of the executor or the event loop may run right away on
+        # this thread and take the lock again
+        self._launch()
+
+    def _launch(self):
+        if not self._executor.submit(self._run, on_discard=self._discard, priority=self._priority):
+            self._discard()
+
+    def _take_credit(self):
+        with self._lock:
+            if self._is_closed:
+                self._is_running = False
+                return None
+
+            if self._credit <= 0:
+                self._is_running = False
+                return False
+
+            self._credit -= 1
+            return True
+
+    def _run(self):
+        while True:
+            credit = self._take_credit()
+
+            if not credit:
+                if credit is None:
+                    self._close_iterator()
+                return
+
+            try:
+                item = next(self._iterator)
+            except StopIteration:
+                self._finish()
+                return
+            except Exception as e:
+                self._finish(e)
+                return
+
+            if not self._send_item(item):
+                return
+
+    def _send_item(self, item):
+        try:
+            self._send(item)
+            return True
+        except Exception as e:
+            self._close_iterator()
+            self._finish(e)
+            return False
+
+    def _finish(self, error=None):
+        with self._lock:
+            self._is_closed = True
+            self._is_running = False
+
+        self._close(error)
+
+    def _discard(self):
+        self._close_iterator()
+        self._finish(Exception('Stream discarded: the JS API queue is full'))
+
+    def _close_iterator(self):
+        try:
+            self._iterator.close()
+        except Exception:
+            logger.exception('Error occurred while closing a stream')
+
+
+class AsyncStream(Stream):
+    """
+    Stream fed by an asynchronous generator. Items are awaited on the asyncio event loop instead of a worker thread.
+    """
+
+    def _launch(self):
+        with self._lock:
+            self._credit -= 1
+
+        run_coroutine(self._iterator.__anext__(), self._on_next)
+
+    def _on_next(self, future):
+        try:
+            item = future.result()
+        except StopAsyncIteration:
+            self._finish()
+            return
+        except Exception as e:
+            self._finish(e)
+            return
+
+        if not self._send_item(item):
+            return
+
+        with self._lock:
+            self._is_running = False
+            is_closed = self._is_closed
+
+        if is_closed:
+            self._close_iterator()
+        else:
+            self._schedule()
+
+    def _close_iterator(self):
+        run_coroutine(self._iterator.aclose(), lambda future: None)
+
+
+class Coalescer(object):
+    """
+    Collapses calls of a function into a single execution. Calls pushed while an execution is pending join it, and the
+    execution uses the parameters of the latest call. The execution is delayed until `throttle` seconds have passed
+    since the previous execution. The page debounces calls before sending them, so only calls pushed while an execution
+    is delayed restart the delay with `debounce` seconds.
+    """
+
+    def __init__(self, schedule, debounce=None, throttle=None):
+        """
+        :param schedule: function called without arguments when a pending execution is due. It must eventually call
+                         take() to collect the calls.
+        :param debounce: number of seconds without new calls to wait for
+        :param throttle: minimum number of seconds between executions
+        """
+        self.debounce = debounce
+        self.throttle = throttle
+        self._schedule = schedule
+        self._items = []
+        self._timer = None
+        self._is_scheduled = False
+        self._last_run = None
+        self._lock = Lock()
+
+    def push(self, item):
+        with self._lock:
+            self._items.append(item)
+
+            if self._is_scheduled:
+                return
+
+            delay = 0
+
+            if self._timer is not None:
+                if not self.debounce:
+                    return
+
+                self._timer.cancel()
+                delay = self.debounce
+
+            if self.throttle and self._last_run is not None:
+                delay = max(delay, self._last_run + self.throttle - clock())
+
+            if delay > 0:
+                self._timer = Timer(delay, self._fire)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+
+            self._is_scheduled = True
+
+        self._schedule()
+
+    def take(self):
+        """
+        Collect the calls of the pending execution
+        :return: a list of pushed items, the latest one last
+        """
+        with self._lock:
+            items = self._items
+            self._items = []
+            self._is_scheduled = False
+            self._last_run = clock()
+            return items
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+
+            self._items = []
+
+    def _fire(self):
+        with self._lock:
+            if current_thread() is not self._timer:
+                # Restarted by a newer call in the meantime
+                return
+
+            self._timer = None
+            self._is_scheduled = True
+
+        self._schedule()
+
+
+class Call(object):
+    """
+    A JS API call in progress. The page cancels a call by aborting the AbortSignal passed to it or gives up on it once
+    its timeout expires. Long running functions can obtain the call they are executing with current_call() and stop
+    early once it is cancelled.
+    """
+
+    def __init__(self, call_id, func_name, timeout=None, priority=NORMAL):
+        """
+        :param call_id: id of the call assigned by the page
+        :param func_name: name of the called function
+        :param timeout: number of seconds the page waits for the result. None means no deadline.
+        :param priority: executor lane of the call
+        """
+        self.id = call_id
+        self.func_name = func_name
+        self.priority = priority
+        self.created = clock()
+        self.started = None
+        self.deadline = self.created + timeout if timeout is not None else None
+        self._cancelled = Event()
+        self._future = None
+        self._lock = Lock()
+
+    @property
+    def cancelled(self):
+        """
+        True if the page cancelled the call or its deadline has passed
+        """
+        return self._cancelled.is_set() or self.expired
+
+    @property
+    def expired(self):
+        return self.deadline is not None and clock() >= self.deadline
+
+    def remaining(self):
+        """
+        :return: number of seconds left until the deadline or None if the call has no deadline
+        """
+        if self.deadline is None:
+            return None
+
+        return max(self.deadline - clock(), 0)
+
+    def wait(self, timeout=None):
+        """
+        Block until the call is cancelled, its deadline passes or the timeout expires
+        :param timeout: number of seconds to wait. None means wait until the call is cancelled.
+        :return: True if the call was cancelled
+        """
+        remaining = self.remaining()
+
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout = remaining
+
+        self._cancelled.wait(timeout)
+        return self.cancelled
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled.set()
+            future = self._future
+
+        if future is not None:
+            future.cancel()
+
+    def set_future(self, future):
+        """
+        Attach the future of a coroutine executing the call, so that cancelling the call cancels the coroutine
+        """
+        with self._lock:
+            self._future = future
+
+        if self.cancelled:
+            future.cancel()
+
+
+def priority(lane):
+    """
+    Decorator setting the default priority of calls of a JS API function
+    :param lane: one of INTERACTIVE, NORMAL or BACKGROUND
+    """
+    if lane not in PRIORITIES:
+        raise ValueError('{0} is not a valid priority'.format(lane))
+
+    def decorator(func):
+        func.priority = lane
+        return func
+
+    return decorator
+
+
+def coalesce(debounce=None, throttle=None):
+    """
+    Decorator making calls of a JS API function coalesce: a call made while a previous one is still pending replaces
+    it, and the promises of all the replaced calls are settled with the result of the latest one. Coalescing is done
+    both in the page and in Python.
+    :param debounce: number of seconds without new calls to wait for before the function is called
+    :param throttle: minimum number of seconds between two calls of the function
+    """
+    def decorator(func):
+        func.coalesce = {'debounce': debounce, 'throttle': throttle}
+        return func
+
+    return decorator
+
+
+def namespace(cls):
+    """
+    Class decorator exposing instances of the class as nested namespaces of the JS API. Public functions of a
+    namespace assigned to a public attribute `db` of the js_api object are available in the page as
+    `pywebview.api.db.<function>`. Namespaces can be nested further.
+    """
+    cls._js_api_namespace = True
+    return cls
+
+
+def is_namespace(obj):
+    return getattr(obj.__class__, '_js_api_namespace', False) is True
+
+
+def max_calls(limit):
+    """
+    Decorator limiting the number of calls of a JS API function in progress in a window, including the queued ones.
+    Calls over the limit are rejected right away.
+    :param limit: maximum number of calls in progress
+    """
+    def decorator(func):
+        func.max_calls = limit
+        return func
+
+    return decorator
+
+
+def cpu_bound(obj):
+    """
+    Decorator running a JS API function in a separate process, so that CPU intensive work does not hold the GIL and
+    block the GUI thread. Applied to a class or an object, it marks all the functions of its instances or of the object.
+    Parameters and results are pickled, so the function, its object and its result must be picklable. Changes of the
+    object state made in the process are not seen by the application.
+    """
+    obj._js_api_process = True
+    return obj
+
+
+def is_cpu_bound(function):
+    return getattr(function, '_js_api_process', False) is True or \
+        getattr(getattr(function, '__self__', None), '_js_api_process', False) is True
+
+
+def current_call():
+    """
+    Get the JS API call executed by the current thread or, from Python 3.7, by the current coroutine
+    :return: Call object or None if the current thread or coroutine does not execute a JS API call
+    """
+    call = getattr(_local, 'call', None)
+
+    if call is None and _current_call is not None:
+        call = _current_call.get()
+
+    return call
+
+
+def set_current_call(call):
+    _local.call = call
+
+    if _current_call is not None:
+        _current_call.set(call)
+
+
+class EventQueue(object):
+    """
+    Collects events emitted to a window. Events emitted within `interval` seconds of the first one are delivered
+    together as a single list.
+    """
+
+    def __init__(self, name, deliver, interval):
+        """
+        :param name: name of the delivering thread
+        :param deliver: function called with a list of events
+        :param interval: number of seconds to collect events for. 0 delivers events as soon as possible.
+        """
+        self.name = name
+        self.interval = interval
+        self._deliver = deliver
+        self._events = []
+        self._condition = Condition()
+        self._thread = None
+        self._is_closed = False
+
+    def put(self, event):
+        with self._condition:
+            if self._is_closed:
+                return
+
+            self._events.append(event)
+
+            if self._thread is None:
+                self._thread = Thread(target=self._work, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+            elif len(self._events) == 1:
+                self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._is_closed = True
+            self._events = []
+            self._condition.notify()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._events and not self._is_closed:
+                    self._condition.wait()
+
+                if self.interval and not self._is_closed:
+                    # Only closing the queue interrupts the wait, new events join the pending ones
+                    deadline = clock() + self.interval
+
+                    while not self._is_closed and clock() < deadline:
+                        self._condition.wait(deadline - clock())
+
+                if self._is_closed:
+                    return
+
+                events = self._events
+                self._events = []
+
+            try:
+                self._deliver(events)
+            except Exception:
+                logger.exception('Error occurred while delivering events to the window')
+
+
+class Bridge(object):
+    """
+    JS API state of a single window: a pool of workers executing calls, a queue delivering their results back to the
+    page and a queue of events emitted to the page.
+    """
+
+    def __init__(self, uid, deliver, config):
+        """
+        :param uid: uid of the window
+        :param deliver: function evaluating a script in the window
+        :param config: webview.config
+        """
+        self.uid = uid
+        self.metrics = BridgeMetrics(config.js_api_metrics)
+        self.executor = BridgeExecutor('pywebview-' + uid, config.js_api_workers, config.js_api_queue_size,
+                                       config.js_api_rejection_policy, config.js_api_starvation_limit)
+        self.scripts = ScriptQueue('pywebview-' + uid + '-results', deliver, self.metrics)
+        self.events = EventQueue('pywebview-' + uid + '-events', self._deliver_events, config.js_event_interval)
+        self.animation_frame = config.js_event_animation_frame
+        self.max_calls = config.js_api_max_calls
+        self.max_calls_per_function = config.js_api_max_calls_per_function
+        self.streams = {}
+        self.calls = {}
+        self.coalescers = {}
+        self.store_messages = deque()
+        self.rejected = {}
+        self._in_flight = {}
+        self._calls_lock = Lock()
+
+    def add_call(self, call, limit=None):
+        """
+        Register a call in progress, unless the window or the function has too many calls in progress already
+        :param limit: maximum number of calls of the function in progress. Default is max_calls_per_function.
+        :return: False if the call is rejected
+        """
+        if limit is None:
+            limit = self.max_calls_per_function
+
+        with self._calls_lock:
+            in_flight = self._in_flight.get(call.func_name, 0)
+
+            if (self.max_calls is not None and len(self.calls) >= self.max_calls) or \
+                    (limit is not None and in_flight >= limit):
+                self.rejected[call.func_name] = self.rejected.get(call.func_name, 0) + 1
+                return False
+
+            self.calls[call.id] = call
+            self._in_flight[call.func_name] = in_flight + 1
+            return True
+
+    def pop_call(self, call_id):
+        """
+        Unregister a call, once it is finished or cancelled
+        :return: the call or None if it is not in progress
+        """
+        with self._calls_lock:
+            call = self.calls.pop(call_id, None)
+
+            if call is not None:
+                self._in_flight[call.func_name] -= 1
+
+            return call
+
+    def count_rejection(self, func_name):
+        with self._calls_lock:
+            self.rejected[func_name] = self.rejected.get(func_name, 0) + 1
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self.scripts.close()
+        self.events.close()
+
+        # Calls, coalescers and streams are registered from several threads
+        with self._calls_lock:
+            calls = list(self.calls.values())
+            coalescers = list(self.coalescers.values())
+            streams = list(self.streams.values())
+
+        for call in calls:
+            call.cancel()
+
+        for coalescer in coalescers:
+            coalescer.cancel()
+
+        for stream in streams:
+            stream.cancel()
+
+    def _deliver_events(self, events):
+        # The pywebview object exists only in windows with a js_api
+        code = 'window.pywebview && window.pywebview._dispatchEvents([{0}], {1})'.format(
+            ','.join(events), 'true' if self.animation_frame else 'false')
+        self.scripts.put(code)
+
+
+def is_coroutine_function(func):
+    return _coroutines_supported and inspect.iscoroutinefunction(func)
+
+
+def is_coroutine(obj):
+    return _coroutines_supported and inspect.iscoroutine(obj)
+
+
+def is_async_generator(obj):
+    return _coroutines_supported and hasattr(inspect, 'isasyncgen') and inspect.isasyncgen(obj)
+
+
+def run_coroutine(coroutine, callback):
+    """
+    Schedule a coroutine on the event loop shared by all the windows. The loop runs in a dedicated thread, which is
+    started on the first call.
+    :param coroutine: coroutine object to run
+    :param callback: function called with a concurrent.futures.Future, once the coroutine is done
+    :return: the concurrent.futures.Future
+    """
+    global _event_loop
+
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            thread = Thread(target=_event_loop.run_forever, name='pywebview-asyncio')
+            thread.daemon = True
+            thread.start()
+
+    future = asyncio.run_coroutine_threadsafe(coroutine, _event_loop)
+    future.add_done_callback(callback)
+    return future
+
+
+def run_in_process(function, args, callback, max_workers=None):
+    """
+    Run a function in the process pool shared by all the windows. The pool is started on the first call.
+    :param function: picklable function to run
+    :param args: picklable arguments of the function
+    :param callback: function called with a concurrent.futures.Future, once the function is done
+    :param max_workers: number of processes of the pool. Default is the number of CPUs.
+    :return: the concurrent.futures.Future
+    """
+    global _process_pool
+
+    if ProcessPoolExecutor is None:
+        raise Exception('Running functions in a process pool requires concurrent.futures')
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = _create_process_pool(max_workers)
+
+        future = _process_pool.submit(function, *args)
+
+    future.add_done_callback(callback)
+    return future
+
+
+def _create_process_pool(max_workers):
+    # Forked processes would inherit the GUI state and the threads of the application, including locks held by them
+    context = _process_context()
+
+    if context is not None:
+        try:
+            return ProcessPoolExecutor(max_workers, mp_context=context)
+        except TypeError:  # mp_context is supported since Python 3.7
+            pass
+
+    return ProcessPoolExecutor(max_workers)
+
+
+def _process_context():
+    """
+    :return: multiprocessing context starting processes with the forkserver or spawn method, or None if start methods
+             are not supported
+    """
+    import multiprocessing
+
+    if not hasattr(multiprocessing, 'get_context'):  # Python 2
+        return None
+
+    methods = multiprocessing.get_all_start_methods()
+
+    for method in ('forkserver', 'spawn'):
+        if method in methods:
+            return multiprocessing.get_context(method)
+
+    return None
+
+
+def shutdown_process_pool():
+    """
+    Stop the process pool. Functions already running in it are allowed to finish.
+    """
+    global _process_pool
+
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+
+    if pool is not None:
+        pool.shutdown(wait=False)
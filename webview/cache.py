@@ -0,0 +1,165 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+"""
+
+import json
+from collections import OrderedDict
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from .bridge import clock
+
+
+class ResultCache(object):
+    """
+    Cache of serialized results of a JS API function, keyed by the parameters of a call. Holds at most maxsize
+    results, the least recently used one is evicted first. If ttl is given, results expire ttl seconds after they were
+    stored.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be greater than zero')
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def get(self, key):
+        """
+        :return: a tuple of (True, result) on a hit and (False, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and (entry[1] is None or entry[1] > clock()):
+                # Move the entry to the end, so that it is evicted last
+                del self._entries[key]
+                self._entries[key] = entry
+                self.hits += 1
+                return True, entry[0]
+
+            if entry is not None:
+                del self._entries[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, key, result):
+        expires = clock() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (result, expires)
+
+            if self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *params):
+        """
+        Drop cached results. Called without arguments drops all the results, otherwise only the result of a call with
+        the given parameters.
+        """
+        with self._lock:
+            if params:
+                self._entries.pop(self.key(params[0]), None)
+            else:
+                self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries),
+                    'maxsize': self.maxsize, 'ttl': self.ttl}
+
+
+class InstanceCaches(object):
+    """
+    Result caches of a JS API function, one per instance of the class the function belongs to, so that instances
+    (e.g. the js_api objects of different windows or users) never see each other's results. Plain functions have a
+    single cache. Caches are dropped together with their instances.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be greater than zero')
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._caches = WeakKeyDictionary()
+        self._function_cache = None
+        self._lock = Lock()
+
+    def of(self, instance=None):
+        """
+        Get the cache of an instance
+        :param instance: the object a method is bound to. None for plain functions.
+        :return: ResultCache or None, if the instance cannot be referenced weakly
+        """
+        with self._lock:
+            if instance is None:
+                if self._function_cache is None:
+                    self._function_cache = ResultCache(self.maxsize, self.ttl)
+
+                return self._function_cache
+
+            try:
+                cache = self._caches.get(instance)
+
+                if cache is None:
+                    cache = self._caches[instance] = ResultCache(self.maxsize, self.ttl)
+            except TypeError:  # not hashable or not weakly referenceable
+                return None
+
+            return cache
+
+    def invalidate(self, *params):
+        """
+        Drop cached results of all the instances. Called without arguments drops all the results, otherwise only the
+        results of a call with the given parameters.
+        """
+        for cache in self._all():
+            cache.invalidate(*params)
+
+    def info(self):
+        """
+        Statistics summed over the caches of all the instances
+        """
+        caches = self._all()
+        return {'hits': sum(c.hits for c in caches), 'misses': sum(c.misses for c in caches),
+                'size': sum(len(c._entries) for c in caches), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                'instances': len(caches)}
+
+    def _all(self):
+        with self._lock:
+            caches = list(self._caches.values())
+
+            if self._function_cache is not None:
+                caches.append(self._function_cache)
+
+            return caches
+
+
+def cached(maxsize=128, ttl=None):
+    """
+    Decorator caching results of a JS API function. Calls from the page with the same parameters are resolved with the
+    cached result without calling the function and serializing its return value again. Calls made from Python are not
+    cached. Each instance of the class of a method has its own cache. The caches are available as the `cache`
+    attribute of the function, an InstanceCaches object.
+    :param maxsize: maximum number of cached results per instance. None means unbounded.
+    :param ttl: number of seconds a result is valid for. None means results do not expire.
+    """
+    def decorator(func):
+        func.cache = InstanceCaches(maxsize, ttl)
+        return func
+
+    return decorator
@@ -16,7 +16,7 @@ from objc import nil, super
 
 from webview.localization import localization
 from webview import OPEN_DIALOG, FOLDER_DIALOG, SAVE_DIALOG
-from webview import _parse_file_type, _js_bridge_call, _parse_api_js
+from webview import _parse_file_type, _js_bridge_call, _parse_api_js, _create_js_bridge, _shutdown_js_bridge, _JSEvaluator
 
 # This lines allow to load non-HTTPS resources, like a local app as: http://127.0.0.1:5000
 bundle = AppKit.NSBundle.mainBundle()
@@ -55,6 +55,10 @@ class BrowserView:
             # Delete the closed instance from the dict
             i = BrowserView.get_instance('window', notification.object())
             del BrowserView.instances[i.uid]
+            _shutdown_js_bridge(i.uid)
+
+            # Complete pending evaluate_js calls
+            i.js_evaluator.close()
 
     class JSBridge(AppKit.NSObject):
         def initWithObject_(self, api_instance):
@@ -63,9 +67,6 @@ class BrowserView:
             return self
 
         def callFunc_withParam_(self, func_name, param):
-            if param is WebKit.WebUndefined.undefined():
-                param = None
-
             i = BrowserView.get_instance('js_bridge', self)
             _js_bridge_call(i.uid, self.api, func_name, param)
 
@@ -182,7 +183,7 @@ class BrowserView:
                 if i.js_bridge:
                     i._set_js_api()
 
-            i.loaded.set()
+            i.js_evaluator.loaded()
 
     class FileFilterChooser(AppKit.NSPopUpButton):
         def initWithFilter_(self, file_filter):
@@ -240,6 +241,7 @@ class BrowserView:
                  confirm_quit, background_color, debug, js_api, webview_ready):
         BrowserView.instances[uid] = self
         self.uid = uid
+        _create_js_bridge(uid)
 
         if debug:
             BrowserView.debug = debug
@@ -251,6 +253,7 @@ class BrowserView:
         self._current_url_semaphore = Semaphore(0)
         self.webview_ready = webview_ready
         self.loaded = Event()
+        self.js_evaluator = _JSEvaluator(PyObjCTools.AppHelper.callAfter, self.loaded)
         self.confirm_quit = confirm_quit
         self.title = title
 
@@ -334,6 +337,9 @@ class BrowserView:
             self._current_url = self.webkit.mainFrameURL()
             self._current_url_semaphore.release()
 
+        if Foundation.NSThread.isMainThread():
+            return self.webkit.mainFrameURL()
+
         PyObjCTools.AppHelper.callAfter(get)
 
         self._current_url_semaphore.acquire()
@@ -357,29 +363,22 @@ class BrowserView:
         self.loaded.clear()
         PyObjCTools.AppHelper.callAfter(load, content, base_uri)
 
-    def evaluate_js(self, script):
-        def evaluate(script):
-            result = self.webkit.windowScriptObject().evaluateWebScript_(script)
-
-            if result is WebKit.WebUndefined.undefined():
-                JSResult.result = None
-            else:
-                try:
-                    JSResult.result = result.__reduce__()[1][0]
-                except TypeError:
-                    JSResult.result = result
+    def evaluate_js(self, script, timeout=None):
+        return self.js_evaluator.wait(lambda: self._evaluate_js(script), timeout)
 
-            JSResult.result_semaphore.release()
+    def evaluate_js_async(self, script, callback):
+        return self.js_evaluator.evaluate(lambda: self._evaluate_js(script), callback)
 
-        class JSResult:
-            result = None
-            result_semaphore = Semaphore(0)
+    def _evaluate_js(self, script):
+        result = self.webkit.windowScriptObject().evaluateWebScript_(script)
 
-        self.loaded.wait()
-        PyObjCTools.AppHelper.callAfter(evaluate, script)
+        if result is WebKit.WebUndefined.undefined():
+            return None
 
-        JSResult.result_semaphore.acquire()
-        return JSResult.result
+        try:
+            return result.__reduce__()[1][0]
+        except TypeError:
+            return result
 
     def _set_js_api(self):
         script = _parse_api_js(self.js_bridge.api)
@@ -610,7 +609,8 @@ def create_file_dialog(dialog_type, directory, allow_multiple, save_filename, fi
         file_filter.append([description, file_extensions or None])
 
     i = list(BrowserView.instances.values())[0]     # arbitary instance
-    return i.create_file_dialog(dialog_type, directory, allow_multiple, save_filename, file_filter)
+    return i.create_file_dialog(dialog_type, directory, allow_multiple, save_filename, file_filter,
+                                main_thread=bool(Foundation.NSThread.isMainThread()))
 
 
 def load_url(url, uid):
@@ -633,5 +633,18 @@ def get_current_url(uid):
     return BrowserView.instances[uid].get_current_url()
 
 
-def evaluate_js(script, uid):
-    return BrowserView.instances[uid].evaluate_js(script)
+def evaluate_js(script, uid, timeout=None):
+    return BrowserView.instances[uid].evaluate_js(script, timeout)
+
+
+def evaluate_js_async(script, uid, callback):
+    browser = BrowserView.instances[uid]
+    token = browser.evaluate_js_async(script, callback)
+    return lambda: browser.js_evaluator.discard(token)
+
+
+def schedule(func, uid=None):
+    if uid is not None and uid not in BrowserView.instances:
+        raise KeyError(uid)
+
+    PyObjCTools.AppHelper.callAfter(func)
@@ -5,13 +5,15 @@ Licensed under BSD license
 http://github.com/r0x0r/pywebview/
 """
 import sys
+import json
 import logging
 
 from uuid import uuid1
 from threading import Event, Semaphore
 from webview.localization import localization
 from webview import OPEN_DIALOG, FOLDER_DIALOG, SAVE_DIALOG
-from webview import _escape_string, _js_bridge_call, _parse_api_js, _parse_file_type
+from webview import config, _escape_string, _js_bridge_call, _parse_api_js, _parse_file_type, _create_js_bridge, _shutdown_js_bridge, \
+    _JSEvaluator
 
 
 logger = logging.getLogger(__name__)
@@ -37,19 +39,22 @@ class BrowserView:
             self.parent_uid = parent_uid
 
         def call(self, func_name, param):
-            if param == 'undefined':
-                param = None
             return _js_bridge_call(self.parent_uid, self.api, func_name, param)
 
     def __init__(self, uid, title, url, width, height, resizable, fullscreen, min_size,
                  confirm_quit, background_color, debug, js_api, webview_ready):
         BrowserView.instances[uid] = self
         self.uid = uid
+        _create_js_bridge(uid)
 
         self.webview_ready = webview_ready
         self.is_fullscreen = False
-        self._js_result_semaphore = Semaphore(0)
         self.load_event = Event()
+        self.js_evaluator = _JSEvaluator(glib.idle_add, self.load_event)
+
+        # Results of evaluate_js are passed back through window.status as messages starting with this prefix
+        self._js_result_prefix = '_' + uuid1().hex[:8] + '_result_'
+        self._js_results = {}
 
         glib.threads_init()
         self.window = gtk.Window(title=title)
@@ -107,10 +112,13 @@ class BrowserView:
 
         self.window.destroy()
         del BrowserView.instances[self.uid]
+        _shutdown_js_bridge(self.uid)
 
         if BrowserView.instances == {}:
             gtk.main_quit()
-        self._js_result_semaphore.release()
+
+        # Complete pending evaluate_js calls
+        self.js_evaluator.close()
 
     def on_destroy(self, widget=None, *data):
         dialog = gtk.MessageDialog(parent=self.window, flags=gtk.DialogFlags.MODAL & gtk.DialogFlags.DESTROY_WITH_PARENT,
@@ -134,9 +142,14 @@ class BrowserView:
         if self.js_bridge:
             self._set_js_api()
         else:
-            self.load_event.set()
+            self.js_evaluator.loaded()
 
     def on_status_change(self, webview, status):
+        if status.startswith(self._js_result_prefix):
+            result_id, result = status[len(self._js_result_prefix):].split('_', 1)
+            self._js_results[result_id] = result
+            return
+
         try:
             delim = '_' + self.js_bridge.uid + '_'
         except AttributeError:
@@ -144,7 +157,7 @@ class BrowserView:
 
         # Check if status was updated by a JSBridge call
         if status.startswith(delim):
-            _, func_name, param = status.split(delim)
+            _, func_name, param = status.split(delim, 2)
             return_val = self.js_bridge.call(func_name, param)
             # Give back the return value to JS as a string
             code = 'pywebview._bridge.return_val = "{0}";'.format(_escape_string(str(return_val)))
@@ -232,43 +245,40 @@ class BrowserView:
         self.load_event.clear()
         self.webview.load_string(content, 'text/html', 'utf-8', base_uri)
 
-    def evaluate_js(self, script):
-        def _evaluate_js():
-            self.webview.execute_script(code)
-            self._js_result_semaphore.release()
-
-        unique_id = uuid1().hex
-
-        # Backup the doc title and store the result in it with a custom prefix
-        code = 'oldTitle{0} = document.title; document.title = eval("{1}");'.format(unique_id, _escape_string(script))
-
-        self.load_event.wait()
+    def evaluate_js(self, script, timeout=None):
+        return self.js_evaluator.wait(lambda: self._evaluate_js(script), timeout)
+
+    def evaluate_js_async(self, script, callback):
+        return self.js_evaluator.evaluate(lambda: self._evaluate_js(script), callback)
+
+    def _evaluate_js(self, script):
+        # The code is evaluated in the global scope and its result is serialized to JSON and written to window.status,
+        # which on_status_change receives synchronously. Errors are passed back the same way.
+        result_id = uuid1().hex
+        code = """
+        window.status = (function() {{
+            try {{
+                return "{0}{1}_" + JSON.stringify({{ value: (0, eval)({2}) }});
+            }} catch (e) {{
+                return "{0}{1}_" + JSON.stringify({{ error: String(e) }});
+            }}
+        }})();
+        window.status = "";""".format(self._js_result_prefix, result_id, json.dumps(script))
+
+        self.webview.execute_script(code)
+        result = self._js_results.pop(result_id, None)
 
-        glib.idle_add(_evaluate_js)
-        self._js_result_semaphore.acquire()
-
-        if not gtk.main_level():
-            # Webview has been closed, don't proceed
+        if result is None:
+            # The page did not run the code, e.g. because it is being unloaded
             return None
 
-        # Restore document title and return
-        _js_result = self._parse_js_result(self.webview.get_title())
+        result = config.js_api_serializer.loads(result)
 
-        code = 'document.title = oldTitle{0};'.format(unique_id)
-        glib.idle_add(self.webview.execute_script, code)
-        return _js_result
-
-    def _parse_js_result(self, result):
-        if result == 'undefined':
+        if 'error' in result:
+            logger.error('Error occurred while evaluating JavaScript code: {0}'.format(result['error']))
             return None
 
-        try:
-            return int(result)
-        except ValueError:
-            try:
-                return float(result)
-            except ValueError:
-                return result
+        return result.get('value')
 
     def _set_js_api(self):
         def create_bridge():
@@ -285,7 +295,7 @@ class BrowserView:
             # Create the `pywebview` JS api object
             self.webview.execute_script(_parse_api_js(self.js_bridge.api))
             self.webview.execute_script(code)
-            self.load_event.set()
+            self.js_evaluator.loaded()
 
         glib.idle_add(create_bridge)
 
@@ -352,11 +362,31 @@ def create_file_dialog(dialog_type, directory, allow_multiple, save_filename, fi
 
         file_name_semaphore.release()
 
-    glib.idle_add(_create)
-    file_name_semaphore.acquire()
+    if glib.MainContext.default().is_owner():
+        # Called on the GUI thread, which cannot wait for itself
+        _create()
+    else:
+        glib.idle_add(_create)
+        file_name_semaphore.acquire()
 
     return file_names[0]
 
 
-def evaluate_js(script, uid):
-    return BrowserView.instances[uid].evaluate_js(script)
+def evaluate_js(script, uid, timeout=None):
+    return BrowserView.instances[uid].evaluate_js(script, timeout)
+
+
+def evaluate_js_async(script, uid, callback):
+    browser = BrowserView.instances[uid]
+    token = browser.evaluate_js_async(script, callback)
+    return lambda: browser.js_evaluator.discard(token)
+
+
+def schedule(func, uid=None):
+    def _func():
+        func()  # Returning a true value would make GLib call the function again
+
+    if uid is not None and uid not in BrowserView.instances:
+        raise KeyError(uid)
+
+    glib.idle_add(_func)
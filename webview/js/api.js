@@ -1,20 +1,411 @@
 window.pywebview = {
-    _createApi: function(funcList) {
-        for (var i = 0; i < funcList.length; i++) {
-            window.pywebview.api[funcList[i]] = (function (funcName) {
-                return function(params) {
-                    var promise = new Promise(function(resolve, reject) {
-                        window.pywebview._checkValue(funcName, resolve);
-                    });
-                    window.pywebview._bridge.call(funcName, JSON.stringify(params))
+    _createApi: function(tree, coalesced) {
+        window.pywebview.api = window.pywebview._createNamespace(tree, '', coalesced);
+    },
+    _createNamespace: function(tree, prefix, coalesced) {
+        // Stubs of functions and nested namespaces are created on first access, where Proxy is supported, so that the
+        // cost of the bootstrap does not grow with the size of the API
+        var hasOwn = Object.prototype.hasOwnProperty;
+
+        function createMember(name) {
+            var path = prefix + name;
+
+            if (tree[name] !== true) {
+                return window.pywebview._createNamespace(tree[name], path + '.', coalesced);
+            }
+
+            if (coalesced[path]) {
+                return window.pywebview._createCoalescedFunction(path, coalesced[path]);
+            }
+
+            return function(params, options) {
+                return window.pywebview._call(path, params, options);
+            }
+        }
+
+        if (typeof Proxy == 'undefined') {
+            var namespace = {};
+
+            for (var name in tree) {
+                if (hasOwn.call(tree, name)) {
+                    namespace[name] = createMember(name);
+                }
+            }
+
+            return namespace;
+        }
+
+        var members = {};
+
+        function isMember(name) {
+            return typeof name == 'string' && hasOwn.call(tree, name);
+        }
+
+        function getMember(name) {
+            if (!hasOwn.call(members, name)) {
+                members[name] = createMember(name);
+            }
+
+            return members[name];
+        }
+
+        return new Proxy(members, {
+            get: function(target, name) {
+                if (hasOwn.call(target, name) || !isMember(name)) {
+                    return target[name];
+                }
+
+                return getMember(name);
+            },
+            has: function(target, name) {
+                return isMember(name) || name in target;
+            },
+            ownKeys: function(target) {
+                var keys = Object.keys(tree);
 
+                for (var name in target) {
+                    if (hasOwn.call(target, name) && !isMember(name)) {
+                        keys.push(name);
+                    }
+                }
+
+                return keys;
+            },
+            getOwnPropertyDescriptor: function(target, name) {
+                if (hasOwn.call(target, name) || !isMember(name)) {
+                    return Object.getOwnPropertyDescriptor(target, name);
+                }
+
+                return { value: getMember(name), writable: true, enumerable: true, configurable: true };
+            }
+        });
+    },
+    _createCoalescedFunction: function(funcName, settings) {
+        // Calls made while a previous call is waiting to be sent replace it. Only the latest parameters are sent after
+        // settings.debounce ms without new calls and at most once per settings.throttle ms. The promises of all the
+        // replaced calls are settled with the result of the sent one.
+        var waiters = [];
+        var latestParams, latestOptions;
+        var timer = null;
+        var lastSent = 0;
+
+        function send() {
+            var current = waiters;
+            waiters = [];
+            timer = null;
+            lastSent = new Date().getTime();
+
+            window.pywebview._call(funcName, latestParams, latestOptions).then(function(value) {
+                for (var i = 0; i < current.length; i++) {
+                    current[i].resolve(value);
+                }
+            }, function(error) {
+                for (var i = 0; i < current.length; i++) {
+                    current[i].reject(error);
+                }
+            });
+        }
+
+        return function(params, options) {
+            var promise = new Promise(function(resolve, reject) {
+                waiters.push({ resolve: resolve, reject: reject });
+            });
+
+            latestParams = params;
+            latestOptions = options;
+
+            if (timer !== null) {
+                if (!settings.debounce) {
                     return promise;
                 }
-            })(funcList[i])
 
-            window.pywebview._returnValues[funcList[i]] = {
-                isSet: false,
-                value: undefined,
+                clearTimeout(timer);
+            }
+
+            var delay = Math.max(settings.debounce, lastSent + settings.throttle - new Date().getTime());
+
+            if (delay > 0) {
+                timer = setTimeout(send, delay);
+            } else {
+                // Send in the next microtask, so that calls made in the same tick coalesce
+                var token = timer = {};
+
+                Promise.resolve().then(function() {
+                    if (timer === token) {
+                        send();
+                    }
+                });
+            }
+
+            return promise;
+        }
+    },
+    _nextCallId: function() {
+        window.pywebview._callCount += 1;
+        return window.pywebview._callPrefix + window.pywebview._callCount;
+    },
+    _call: function(funcName, params, options) {
+        var signal = options && options.signal;
+        var timeout = options && options.timeout;
+
+        if (signal && signal.aborted) {
+            return Promise.reject(window.pywebview._abortReason(signal));
+        }
+
+        var id = window.pywebview._nextCallId();
+        var promise = new Promise(function(resolve, reject) {
+            window.pywebview._pendingCalls[id] = { resolve: resolve, reject: reject };
+        });
+
+        if (signal || timeout) {
+            window.pywebview._watchCall(id, signal, timeout);
+        }
+
+        window.pywebview._send(funcName, id, params, options);
+
+        return promise;
+    },
+    _watchCall: function(id, signal, timeout) {
+        // Aborting the signal or exceeding the timeout rejects the promise and cancels the call on the Python side
+        function abort() {
+            window.pywebview._cancelCall(id, window.pywebview._abortReason(signal));
+        }
+
+        function expire() {
+            var error = new Error('The call timed out after ' + timeout + ' ms');
+            error.name = 'TimeoutError';
+            window.pywebview._cancelCall(id, error);
+        }
+
+        var timer = timeout ? setTimeout(expire, timeout) : null;
+
+        if (signal) {
+            signal.addEventListener('abort', abort);
+        }
+
+        window.pywebview._callWatchers[id] = function() {
+            clearTimeout(timer);
+
+            if (signal) {
+                signal.removeEventListener('abort', abort);
+            }
+        };
+    },
+    _unwatchCall: function(id) {
+        var unwatch = window.pywebview._callWatchers[id];
+
+        if (unwatch) {
+            delete window.pywebview._callWatchers[id];
+            unwatch();
+        }
+    },
+    _cancelCall: function(id, reason) {
+        var call = window.pywebview._pendingCalls[id];
+        var stream = window.pywebview._streams[id];
+        window.pywebview._unwatchCall(id);
+
+        if (call) {
+            delete window.pywebview._pendingCalls[id];
+            window.pywebview._send('_cancel', id, null);
+            call.reject(reason);
+        } else if (stream) {
+            // The call has already turned into a stream
+            stream._reason = reason;
+            stream.return();
+        }
+    },
+    _abortReason: function(signal) {
+        if (signal.reason !== undefined) {
+            return signal.reason;
+        }
+
+        var error = new Error('The call was aborted');
+        error.name = 'AbortError';
+        return error;
+    },
+    _send: function(funcName, id, params, options) {
+        // Messages sent in the same tick are passed to Python together in a single batch
+        var message = { func: funcName, id: id, params: params };
+
+        if (options && options.timeout) {
+            message.timeout = options.timeout;
+        }
+
+        if (options && options.priority) {
+            message.priority = options.priority;
+        }
+
+        window.pywebview._callQueue.push(message);
+
+        if (window.pywebview._callQueue.length == 1) {
+            Promise.resolve().then(window.pywebview._flushCalls);
+        }
+    },
+    _flushCalls: function() {
+        var calls = window.pywebview._callQueue;
+        window.pywebview._callQueue = [];
+        window.pywebview._bridge.call('_batch', JSON.stringify(calls));
+    },
+    on: function(event, handler) {
+        // Register a handler of events emitted by webview.emit() in Python
+        var handlers = window.pywebview._eventHandlers;
+        (handlers[event] = handlers[event] || []).push(handler);
+    },
+    off: function(event, handler) {
+        var handlers = window.pywebview._eventHandlers[event] || [];
+
+        for (var i = handlers.length - 1; i >= 0; i--) {
+            if (!handler || handlers[i] === handler) {
+                handlers.splice(i, 1);
+            }
+        }
+    },
+    _dispatchEvents: function(events, onAnimationFrame) {
+        var queue = window.pywebview._eventQueue;
+
+        if (!onAnimationFrame || !window.requestAnimationFrame) {
+            window.pywebview._handleEvents(events);
+            return;
+        }
+
+        // Events arriving before the next frame are handled together in it
+        queue.push.apply(queue, events);
+
+        if (queue.length == events.length) {
+            window.requestAnimationFrame(function() {
+                var pending = window.pywebview._eventQueue;
+                window.pywebview._eventQueue = [];
+                window.pywebview._handleEvents(pending);
+            });
+        }
+    },
+    _handleEvents: function(events) {
+        for (var i = 0; i < events.length; i++) {
+            var handlers = (window.pywebview._eventHandlers[events[i][0]] || []).slice();
+
+            for (var j = 0; j < handlers.length; j++) {
+                try {
+                    handlers[j](events[i][1]);
+                } catch (e) {
+                    // Report the error without interrupting the other handlers
+                    setTimeout(function(error) { throw error; }.bind(null, e));
+                }
+            }
+        }
+    },
+    store: function(name) {
+        // Access a webview.Store shared with Python. Its data is undefined until the first snapshot arrives.
+        var stores = window.pywebview._stores;
+
+        if (!stores[name]) {
+            stores[name] = window.pywebview._createStore(name);
+            window.pywebview._send('_store', null, { name: name, resync: true });
+        }
+
+        return stores[name];
+    },
+    _createStore: function(name) {
+        var store = {
+            name: name,
+            data: undefined,
+            version: -1,
+            set: function(path, value) {
+                store._change({ op: 'replace', path: path, value: value });
+            },
+            append: function(path, value) {
+                store._change({ op: 'add', path: path.replace(/\/$/, '') + '/-', value: value });
+            },
+            remove: function(path) {
+                store._change({ op: 'remove', path: path });
+            },
+            subscribe: function(handler) {
+                store._handlers.push(handler);
+
+                return function() {
+                    var index = store._handlers.indexOf(handler);
+
+                    if (index != -1) {
+                        store._handlers.splice(index, 1);
+                    }
+                };
+            },
+            _change: function(operation) {
+                // Changes are applied by Python, which sends them back to all the pages
+                window.pywebview._send('_store', null, { name: name, ops: [operation] });
+            },
+            _handlers: [],
+            _resyncing: true,
+        };
+
+        return store;
+    },
+    _updateStore: function(delta) {
+        var store = window.pywebview._stores[delta.name];
+
+        if (!store) {
+            return;
+        }
+
+        if ('data' in delta) {
+            if (delta.version < store.version) {
+                return;
+            }
+
+            store.data = delta.data;
+            store._resyncing = false;
+        } else if (delta.version <= store.version) {
+            // Already contained in the snapshot
+            return;
+        } else if (delta.version != store.version + 1) {
+            // A delta was missed, so the whole document is requested once
+            if (!store._resyncing) {
+                store._resyncing = true;
+                window.pywebview._send('_store', null, { name: store.name, resync: true });
+            }
+            return;
+        } else {
+            window.pywebview._applyPatch(store.data, delta.ops);
+        }
+
+        store.version = delta.version;
+
+        var handlers = store._handlers.slice();
+
+        for (var i = 0; i < handlers.length; i++) {
+            try {
+                handlers[i](store.data, delta.ops || null);
+            } catch (e) {
+                setTimeout(function(error) { throw error; }.bind(null, e));
+            }
+        }
+    },
+    _applyPatch: function(data, operations) {
+        for (var i = 0; i < operations.length; i++) {
+            var operation = operations[i];
+            var keys = operation.path.split('/').slice(1).map(function(key) {
+                return key.replace(/~1/g, '/').replace(/~0/g, '~');
+            });
+            var key = keys.pop();
+            var parent = data;
+
+            for (var j = 0; j < keys.length; j++) {
+                parent = parent[keys[j]];
+            }
+
+            if (Array.isArray(parent)) {
+                var index = key == '-' ? parent.length : parseInt(key, 10);
+
+                if (operation.op == 'add') {
+                    parent.splice(index, 0, operation.value);
+                } else if (operation.op == 'remove') {
+                    parent.splice(index, 1);
+                } else {
+                    parent[index] = operation.value;
+                }
+            } else if (operation.op == 'remove') {
+                delete parent[key];
+            } else {
+                parent[key] = operation.value;
             }
         }
     },
@@ -31,25 +422,227 @@ window.pywebview = {
         }
     },
 
-    _checkValue: function(funcName, resolve) {
-         var check = setInterval(function () {
-            var returnObj = window.pywebview._returnValues[funcName]
+    _supersede: function(id, latestId) {
+        // Python executed a newer call of the same function instead, settle the call with its result
+        var call = window.pywebview._pendingCalls[id];
+        var latest = window.pywebview._pendingCalls[latestId];
 
-            if (returnObj.isSet) {
-                returnObj.isSet = false
-                try {
-                    resolve(JSON.parse(returnObj.value.replace(/\n/, '\\n')))
-                } catch(e) {
-                    resolve(returnObj.value)
+        if (!call) {
+            return;
+        }
+
+        delete window.pywebview._pendingCalls[id];
+        window.pywebview._unwatchCall(id);
+
+        if (!latest) {
+            var error = new Error('The call was replaced by a newer call, which was cancelled');
+            error.name = 'AbortError';
+            call.reject(error);
+            return;
+        }
+
+        var resolve = latest.resolve;
+        var reject = latest.reject;
+        latest.resolve = function(value) { resolve(value); call.resolve(value); };
+        latest.reject = function(error) { reject(error); call.reject(error); };
+    },
+
+    _resolve: function(id, value) {
+        var call = window.pywebview._pendingCalls[id];
+
+        if (call) {
+            delete window.pywebview._pendingCalls[id];
+            window.pywebview._unwatchCall(id);
+            call.resolve(value);
+        }
+    },
+
+    _reject: function(id, error) {
+        var call = window.pywebview._pendingCalls[id];
+
+        if (call) {
+            delete window.pywebview._pendingCalls[id];
+            window.pywebview._unwatchCall(id);
+
+            var e = new Error(error.message);
+            e.name = error.name;
+            call.reject(e);
+        }
+    },
+    _openStream: function(id, bufferSize) {
+        var call = window.pywebview._pendingCalls[id];
+
+        if (!call) {
+            window.pywebview._send('_stream', id, { cancel: true });
+            return;
+        }
+
+        delete window.pywebview._pendingCalls[id];
+
+        var stream = window.pywebview._createStream(id, bufferSize);
+        window.pywebview._streams[id] = stream;
+        call.resolve(stream);
+    },
+
+    _openBinaryStream: function(id, length, bufferSize) {
+        var call = window.pywebview._pendingCalls[id];
+
+        if (!call) {
+            window.pywebview._send('_stream', id, { cancel: true });
+            return;
+        }
+
+        delete window.pywebview._pendingCalls[id];
+
+        var stream = window.pywebview._createStream(id, bufferSize);
+        var data = new Uint8Array(length);
+        var offset = 0;
+        window.pywebview._streams[id] = stream;
+
+        function read() {
+            stream.next().then(function(chunk) {
+                if (stream._reason) {
+                    call.reject(stream._reason);
+                } else if (chunk.done) {
+                    call.resolve(data);
+                } else {
+                    offset = window.pywebview._decodeBase64(chunk.value, data, offset);
+                    read();
                 }
+            }, call.reject);
+        }
 
-                clearInterval(check);
+        read();
+    },
+
+    _decodeBase64: function(text, target, offset) {
+        var binary = window.atob(text);
+
+        for (var i = 0; i < binary.length; i++) {
+            target[offset + i] = binary.charCodeAt(i);
+        }
+
+        return offset + binary.length;
+    },
+
+    _pushStream: function(id, value) {
+        var stream = window.pywebview._streams[id];
+
+        if (stream) {
+            stream._push(value);
+        }
+    },
+
+    _closeStream: function(id, error) {
+        var stream = window.pywebview._streams[id];
+
+        if (stream) {
+            delete window.pywebview._streams[id];
+            window.pywebview._unwatchCall(id);
+            stream._close(error);
+        }
+    },
+
+    _createStream: function(id, bufferSize) {
+        // An async iterator over the values yielded by a Python generator. Python sends at most bufferSize values
+        // ahead and waits until the consumed values are acknowledged.
+        var buffer = [];
+        var readers = [];
+        var consumed = 0;
+        var done = false;
+        var error = null;
+
+        function acknowledge() {
+            consumed += 1;
+
+            if (consumed * 2 >= bufferSize) {
+                window.pywebview._send('_stream', id, { credit: consumed });
+                consumed = 0;
             }
-         }, 100)
+        }
+
+        var stream = {
+            next: function() {
+                if (buffer.length > 0) {
+                    var value = buffer.shift();
+                    acknowledge();
+                    return Promise.resolve({ value: value, done: false });
+                }
+
+                if (error) {
+                    return Promise.reject(error);
+                }
+
+                if (done) {
+                    return Promise.resolve({ value: undefined, done: true });
+                }
+
+                return new Promise(function(resolve, reject) {
+                    readers.push({ resolve: resolve, reject: reject });
+                });
+            },
+
+            return: function() {
+                if (!done) {
+                    done = true;
+                    buffer = [];
+                    delete window.pywebview._streams[id];
+                    window.pywebview._unwatchCall(id);
+                    window.pywebview._send('_stream', id, { cancel: true });
+                    stream._close(null);
+                }
+
+                return Promise.resolve({ value: undefined, done: true });
+            },
+
+            _push: function(value) {
+                if (readers.length > 0) {
+                    readers.shift().resolve({ value: value, done: false });
+                    acknowledge();
+                } else {
+                    buffer.push(value);
+                }
+            },
+
+            _close: function(err) {
+                done = true;
+
+                if (err) {
+                    error = new Error(err.message);
+                    error.name = err.name;
+                }
+
+                while (readers.length > 0) {
+                    var reader = readers.shift();
+
+                    if (error) {
+                        reader.reject(error);
+                    } else {
+                        reader.resolve({ value: undefined, done: true });
+                    }
+                }
+            }
+        };
+
+        if (typeof Symbol != 'undefined' && Symbol.asyncIterator) {
+            stream[Symbol.asyncIterator] = function() { return stream; };
+        }
+
+        return stream;
     },
     api: {},
-    _returnValues: {},
+    _pendingCalls: {},
+    _callQueue: [],
+    _streams: {},
+    _stores: {},
+    _callWatchers: {},
+    _eventHandlers: {
+        _store: [function(delta) { window.pywebview._updateStore(delta); }],
+    },
+    _eventQueue: [],
+    _callPrefix: Math.random().toString(36).substr(2) + '.',
+    _callCount: 0,
 
 }
 
-window.pywebview._createApi(%s)
+window.pywebview._createApi(%s, %s)
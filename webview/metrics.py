@@ -0,0 +1,175 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+"""
+
+from threading import Lock
+
+
+class Histogram(object):
+    """
+    Histogram with logarithmic buckets. A value is counted in the bucket of its bit length, i.e. bucket n holds values
+    from 2^(n-1) to 2^n - 1 units. Recording a value costs a few integer operations and percentiles are estimated from
+    the buckets with a relative error of at most 2x.
+    """
+
+    def __init__(self, unit=1.0):
+        """
+        :param unit: size of a unit of the recorded values, for example 1e-6 to count seconds in microseconds
+        """
+        self.unit = unit
+        self._scale = 1.0 / unit
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = [0] * 64
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+
+        if value > self.max:
+            self.max = value
+
+        bucket = int(value * self._scale).bit_length()
+        self._buckets[bucket if bucket < 64 else 63] += 1
+
+    def percentile(self, fraction):
+        if self.count == 0:
+            return 0.0
+
+        rank = fraction * self.count
+        seen = 0
+
+        for bucket, count in enumerate(self._buckets):
+            seen += count
+
+            if seen >= rank:
+                # Upper bound of the bucket, which cannot exceed the maximum recorded value
+                return min(((1 << bucket) - 1) * self.unit, self.max)
+
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'max': self.max, 'p50': self.percentile(0.5), 'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99)}
+
+
+class MethodMetrics(object):
+    """
+    Metrics of the calls of a single JS API function. Times are in seconds, sizes in bytes.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.queued = Histogram(1e-6)
+        self.executing = Histogram(1e-6)
+        self.serialization = Histogram(1e-6)
+        self.delivery = Histogram(1e-6)
+        self.response_bytes = Histogram()
+
+    def snapshot(self):
+        return {'calls': self.calls, 'errors': self.errors, 'queued': self.queued.snapshot(),
+                'executing': self.executing.snapshot(), 'serialization': self.serialization.snapshot(),
+                'delivery': self.delivery.snapshot(), 'response_bytes': self.response_bytes.snapshot()}
+
+
+class BridgeMetrics(object):
+    """
+    Metrics of the JS API traffic of a window. Calls arrive from the page in batched messages, so request sizes are
+    recorded per message. Results are recorded per function.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = Lock()
+        self._reset()
+
+    def record_message(self, size, calls):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.request_bytes.add(size)
+            self.calls_per_message.add(calls)
+
+    def record_start(self, func_name, queued=None):
+        """
+        Record a call of a function
+        :param queued: number of seconds the call waited for a worker. None for calls that were not queued.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            metrics = self._method(func_name)
+            metrics.calls += 1
+
+            if queued is not None:
+                metrics.queued.add(queued)
+
+    def record_finish(self, func_name, executing, serialization=None, response_bytes=None, error=False):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            metrics = self._method(func_name)
+            metrics.executing.add(executing)
+
+            if error:
+                metrics.errors += 1
+
+            if serialization is not None:
+                metrics.serialization.add(serialization)
+
+            if response_bytes is not None:
+                metrics.response_bytes.add(response_bytes)
+
+    def record_delivery(self, func_name, delivery):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._method(func_name).delivery.add(delivery)
+
+    def record_evaluation(self, duration, scripts):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.evaluation.add(duration)
+            self.scripts_per_evaluation.add(scripts)
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            snapshot = {
+                'request_bytes': self.request_bytes.snapshot(),
+                'calls_per_message': self.calls_per_message.snapshot(),
+                'evaluation': self.evaluation.snapshot(),
+                'scripts_per_evaluation': self.scripts_per_evaluation.snapshot(),
+                'methods': dict((name, metrics.snapshot()) for name, metrics in self.methods.items())
+            }
+
+            if reset:
+                self._reset()
+
+            return snapshot
+
+    def _method(self, func_name):
+        metrics = self.methods.get(func_name)
+
+        if metrics is None:
+            metrics = self.methods[func_name] = MethodMetrics()
+
+        return metrics
+
+    def _reset(self):
+        self.request_bytes = Histogram()
+        self.calls_per_message = Histogram()
+        self.evaluation = Histogram(1e-6)
+        self.scripts_per_evaluation = Histogram()
+        self.methods = {}
@@ -8,13 +8,14 @@ http://github.com/r0x0r/pywebview/
 import logging
 import os
 import sys
+import json
 import base64
 from threading import Semaphore, Event
 from cefpython3 import cefpython as cef
 import platform
 
 from webview import OPEN_DIALOG, FOLDER_DIALOG, SAVE_DIALOG
-from webview import _parse_api_js, _js_bridge_call
+from webview import config, _parse_api_js, _js_bridge_call, _create_js_bridge, _shutdown_js_bridge, _JSEvaluator
 from webview.localization import localization
 
 
@@ -25,6 +26,20 @@ WindowUtils = cef.WindowUtils()
 
 logger = logging.getLogger(__name__)
 
+# Evaluates code in the global scope and passes the result as JSON to the pywebviewResult function bound by
+# BrowserView along with the token of the evaluation
+_evaluate_js_code = """(function() {
+    var result;
+
+    try {
+        result = JSON.stringify({ value: (0, eval)(%s) });
+    } catch (e) {
+        result = JSON.stringify({ error: String(e) });
+    }
+
+    window.pywebviewResult(%d, result);
+})();"""
+
 
 # Try importing Qt5 modules
 try:
@@ -68,7 +83,7 @@ class BrowserView(QMainWindow):
     destroy_trigger = QtCore.pyqtSignal()
     fullscreen_trigger = QtCore.pyqtSignal()
     current_url_trigger = QtCore.pyqtSignal()
-    evaluate_js_trigger = QtCore.pyqtSignal(str)
+    evaluate_js_trigger = QtCore.pyqtSignal(object)
 
     sys.excepthook = cef.ExceptHook  # To shutdown all CEF processes on error
 
@@ -91,21 +106,29 @@ class BrowserView(QMainWindow):
 
             return _js_bridge_call(self.parent_uid, self.api, func_name, param)
 
+    class LoadHandler(object):
+        def __init__(self, browser_view):
+            self.browser_view = browser_view
+
+        def OnLoadingStateChange(self, browser, is_loading, **_):
+            if not is_loading:
+                self.browser_view.js_evaluator.loaded()
+
     def __init__(self, uid, title, url, width, height, resizable, fullscreen,
                  min_size, confirm_quit, background_color, debug, js_api, webview_ready):
         super(BrowserView, self).__init__()
         BrowserView.instances[uid] = self
         self.uid = uid
+        _create_js_bridge(uid)
 
         self.is_fullscreen = False
         self.confirm_quit = confirm_quit
 
         self._file_name_semaphore = Semaphore(0)
         self._current_url_semaphore = Semaphore()
-        self._evaluate_js_semaphore = Semaphore(0)
         self.load_event = Event()
+        self.js_evaluator = _JSEvaluator(self.evaluate_js_trigger.emit, self.load_event)
 
-        self._evaluate_js_result = None
         self._current_url = None
         self._file_name = None
 
@@ -137,6 +160,12 @@ class BrowserView(QMainWindow):
         else:
             self.view = cef.CreateBrowserSync(window_info,url="about:blank",settings=setting)
 
+        # Results of evaluate_js are passed back by the page with a function bound to the window object. Each
+        # evaluation has its own token, so that concurrent evaluations get their own results.
+        bindings = cef.JavascriptBindings(bindToFrames=False, bindToPopups=False)
+        bindings.SetFunction('pywebviewResult', self._on_js_result)
+        self.view.SetJavascriptBindings(bindings)
+        self.view.SetClientHandler(BrowserView.LoadHandler(self))
 
         # self.browser.SetClientHandler(LoadHandler(self.parent.navigation_bar))
         # self.browser.SetClientHandler(FocusHandler(self))
@@ -159,8 +188,6 @@ class BrowserView(QMainWindow):
         #     self.channel = QWebChannel(self.view.page())
         #     self.view.page().setWebChannel(self.channel)
 
-        self.load_event.set()
-
         if fullscreen:
             self.toggle_fullscreen()
 
@@ -201,7 +228,6 @@ class BrowserView(QMainWindow):
 
     def on_load_url(self, url):
         self.view.LoadUrl(url)
-        self.load_event.set()
 
     def on_load_html(self, html, js_callback=None):
         # This function is called in two ways:
@@ -219,7 +245,6 @@ class BrowserView(QMainWindow):
             js_callback.Call(ret)
         else:
              self.view.LoadUrl(ret)
-        self.load_event.set()
 
 
 
@@ -244,6 +269,10 @@ class BrowserView(QMainWindow):
 
         event.accept()
         # del BrowserView.instances[self.uid]
+        _shutdown_js_bridge(self.uid)
+
+        # Complete pending evaluate_js calls
+        self.js_evaluator.close()
 
         super(BrowserView, self).closeEvent(event)
 
@@ -262,14 +291,19 @@ class BrowserView(QMainWindow):
 
         self.is_fullscreen = not self.is_fullscreen
 
-    def on_evaluate_js(self, script):
+    def on_evaluate_js(self, func):
+        func()
 
-        self._evaluate_js_semaphore.release()
+    def _start_js(self, script, token):
+        self.view.GetMainFrame().ExecuteJavascript(_evaluate_js_code % (json.dumps(script), token))
 
-        self.view.GetMainFrame().ExecuteJavascript(script)
+    def _on_js_result(self, token, result):
+        result = config.js_api_serializer.loads(result)
 
-        # self._evaluate_js_result = self.view.ExecuteJavascript(script)
+        if 'error' in result:
+            logger.error('Error occurred while evaluating JavaScript code: {0}'.format(result['error']))
 
+        self.js_evaluator.complete(token, result.get('value'))
 
     def on_load_finished(self):
         if self.js_bridge.api:
@@ -326,13 +360,11 @@ class BrowserView(QMainWindow):
     def toggle_fullscreen(self):
         self.fullscreen_trigger.emit()
 
-    def evaluate_js(self, script):
-        self.load_event.wait()
-        print("evaluate_js")
-        self.evaluate_js_trigger.emit(script)
-        self._evaluate_js_semaphore.acquire()
+    def evaluate_js(self, script, timeout=None):
+        return self.js_evaluator.wait_start(lambda token: self._start_js(script, token), timeout)
 
-        return self._evaluate_js_result
+    def evaluate_js_async(self, script, callback):
+        return self.js_evaluator.start(lambda token: self._start_js(script, token), callback)
 
     def js_api(self, content):
         # Execute Javascript function "js_print"
@@ -449,8 +481,19 @@ def create_file_dialog(dialog_type, directory, allow_multiple, save_filename, fi
     return i.create_file_dialog(dialog_type, directory, allow_multiple, save_filename, file_filter)
 
 
-def evaluate_js(script, uid):
-    return BrowserView.instances[uid].evaluate_js(script)
+def evaluate_js(script, uid, timeout=None):
+    return BrowserView.instances[uid].evaluate_js(script, timeout)
+
+
+def evaluate_js_async(script, uid, callback):
+    browser = BrowserView.instances[uid]
+    token = browser.evaluate_js_async(script, callback)
+    return lambda: browser.js_evaluator.discard(token)
+
+
+def schedule(func, uid=None):
+    browser = BrowserView.instances[uid] if uid is not None else list(BrowserView.instances.values())[0]
+    browser.evaluate_js_trigger.emit(func)
 
 
 class CefApplication(QApplication):
@@ -0,0 +1,116 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+"""
+
+import datetime
+import decimal
+import json
+from threading import Lock
+
+try:
+    import enum
+except ImportError:  # Python 2 without the enum34 backport
+    enum = None
+
+try:
+    import dataclasses
+except ImportError:  # Python < 3.7
+    dataclasses = None
+
+
+class JSONSerializer(object):
+    """
+    Serializer of the JS API traffic based on the json module of the standard library. dumps() must return a JSON
+    text, which is embedded in the page as a JavaScript expression.
+
+    Types JSON has no notion of are converted by encoders registered with register(). datetime, date and time objects
+    are converted to ISO 8601 strings, Decimal to float, Enum to its value and dataclasses to dict. Encoders are looked
+    up by the exact type of an object first and then by its base classes. The outcome of the lookup is cached per type.
+    """
+
+    def __init__(self):
+        self._encoders = {}
+        self._encoder_cache = {}
+        self._lock = Lock()
+
+        self.register(datetime.datetime, _isoformat)
+        self.register(datetime.date, _isoformat)
+        self.register(datetime.time, _isoformat)
+        self.register(decimal.Decimal, float)
+
+        if enum is not None:
+            self.register(enum.Enum, _enum_value)
+
+    def register(self, type_, encoder):
+        """
+        Register an encoder for a custom type
+        :param type_: the type (or base class) to encode
+        :param encoder: function that converts an instance of the type to a JSON serializable object
+        """
+        with self._lock:
+            self._encoders[type_] = encoder
+            self._encoder_cache = {}
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=self.default)
+
+    def loads(self, text):
+        return json.loads(text)
+
+    def default(self, obj):
+        obj_type = type(obj)
+
+        try:
+            encoder = self._encoder_cache[obj_type]
+        except KeyError:
+            encoder = self._find_encoder(obj_type)
+            self._encoder_cache[obj_type] = encoder
+
+        if encoder is None:
+            raise TypeError('Object of type {0} is not JSON serializable'.format(obj_type.__name__))
+
+        return encoder(obj)
+
+    def _find_encoder(self, obj_type):
+        for base in getattr(obj_type, '__mro__', (obj_type,)):
+            if base in self._encoders:
+                return self._encoders[base]
+
+        if dataclasses is not None and dataclasses.is_dataclass(obj_type):
+            return dataclasses.asdict
+
+        return None
+
+
+class OrjsonSerializer(JSONSerializer):
+    """
+    Serializer based on orjson (https://github.com/ijl/orjson). orjson converts datetime, dataclass and Enum objects
+    natively, so the registered encoders are used only for the types orjson does not support itself.
+    """
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        super(OrjsonSerializer, self).__init__()
+
+    def dumps(self, obj):
+        text = self._orjson.dumps(obj, default=self.default).decode('utf-8')
+
+        # orjson does not escape non-ASCII characters. U+2028 and U+2029 are valid in JSON, but terminate string
+        # literals in pre-ES2019 JavaScript engines.
+        return text.replace(u'\u2028', u'\\u2028').replace(u'\u2029', u'\\u2029')
+
+    def loads(self, text):
+        return self._orjson.loads(text)
+
+
+def _isoformat(obj):
+    return obj.isoformat()
+
+
+def _enum_value(obj):
+    return obj.value
@@ -0,0 +1,262 @@
+"""
+(C) 2014-2016 Roman Sirokov and contributors
+Licensed under BSD license
+
+http://github.com/r0x0r/pywebview/
+"""
+
+import logging
+from contextlib import contextmanager
+from threading import RLock
+
+
+logger = logging.getLogger(__name__)
+
+_stores = {}
+
+
+class Store(object):
+    """
+    A JSON document shared between Python and the pages of one or more windows. Changes made with set(), append() and
+    remove() are sent to the pages as versioned deltas of JSON Patch style operations. The page applies a delta only if
+    it directly follows its version of the document, otherwise it asks for the whole document. Changes made in the page
+    with the same methods of pywebview.store(name) are applied in Python first and sent back to all the pages.
+
+    Paths are JSON Pointers, e.g. '/todos/0/done'. '-' as the last segment of a path to a list refers to the end of
+    the list.
+    """
+
+    def __init__(self, name, data=None, uid='master'):
+        """
+        :param name: name of the store, by which the page accesses it
+        :param data: initial JSON serializable document. Default is an empty dict.
+        :param uid: uid of the window to share the store with. More windows can be added with attach().
+        """
+        self.name = name
+        self.version = 0
+        self._data = {} if data is None else data
+        self._uids = set([uid])
+        self._handlers = []
+        self._batch = None
+        self._lock = RLock()
+
+        _stores[name] = self
+
+    @property
+    def data(self):
+        """
+        The current document. It must not be modified directly, since such changes are not sent to the page.
+        """
+        return self._data
+
+    def get(self, path='', default=None):
+        try:
+            return _resolve(self._data, _parse_path(path))
+        except (KeyError, IndexError, TypeError, ValueError):
+            return default
+
+    def set(self, path, value):
+        self._change([{'op': 'replace', 'path': path, 'value': value}])
+
+    def append(self, path, value):
+        self._change([{'op': 'add', 'path': path.rstrip('/') + '/-', 'value': value}])
+
+    def remove(self, path):
+        self._change([{'op': 'remove', 'path': path}])
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager sending all the changes made within it as a single delta
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield
+                return
+
+            self._batch = []
+
+            try:
+                yield
+            finally:
+                operations, self._batch = self._batch, None
+
+                if operations:
+                    self._publish(operations)
+
+    def subscribe(self, handler):
+        """
+        Call a function with the list of operations after each change, including the changes made in the page
+        """
+        self._handlers.append(handler)
+
+    def unsubscribe(self, handler):
+        self._handlers.remove(handler)
+
+    def attach(self, uid):
+        """
+        Share the store with another window
+        """
+        with self._lock:
+            self._uids.add(uid)
+            self._send_snapshot(uid)
+
+    def detach(self, uid):
+        with self._lock:
+            self._uids.discard(uid)
+
+    def close(self):
+        """
+        Stop sharing the store with the pages
+        """
+        with self._lock:
+            self._uids = set()
+
+            if _stores.get(self.name) is self:
+                del _stores[self.name]
+
+    def _change(self, operations):
+        with self._lock:
+            applied = _apply_patch(self._data, operations)
+
+            if self._batch is not None:
+                self._batch.extend(applied)
+            elif applied:
+                self._publish(applied)
+
+        return applied
+
+    def _publish(self, operations):
+        self.version += 1
+        delta = {'name': self.name, 'version': self.version, 'ops': operations}
+
+        for uid in self._uids:
+            _emit(uid, delta)
+
+        for handler in list(self._handlers):
+            try:
+                handler(operations)
+            except Exception:
+                logger.exception('Error occurred in a handler of store {0}'.format(self.name))
+
+    def _send_snapshot(self, uid):
+        with self._lock:
+            _emit(uid, {'name': self.name, 'version': self.version, 'data': self._data})
+
+
+def _emit(uid, message):
+    # Windows that have been closed meanwhile are skipped
+    from webview import _get_bridge, _emit_js_event
+
+    bridge = _get_bridge(uid)
+
+    if bridge is not None:
+        _emit_js_event(bridge, '_store', message)
+
+
+def update_store(uid, message):
+    """
+    Handle a '_store' message from the page: either a request for the whole document or a list of operations to apply
+    """
+    store = _stores.get(message.get('name'))
+
+    if store is None or uid not in store._uids:
+        logger.error('Store {0} is not shared with window {1}'.format(message.get('name'), uid))
+        return
+
+    if message.get('resync'):
+        store._send_snapshot(uid)
+    else:
+        with store._lock:
+            store._change(message.get('ops') or [])
+
+
+def detach_stores(uid):
+    """
+    Stop sharing all the stores with a closed window
+    """
+    for store in list(_stores.values()):
+        store.detach(uid)
+
+
+def _apply_patch(document, operations):
+    """
+    Apply operations to a document in place
+    :return: the list of operations that were applied. Application stops at the first invalid operation.
+    """
+    applied = []
+
+    for operation in operations:
+        try:
+            _apply_operation(document, operation)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error('Cannot apply {0}: {1}'.format(operation, e))
+            break
+
+        applied.append(operation)
+
+    return applied
+
+
+def _apply_operation(document, operation):
+    op = operation['op']
+    path = _parse_path(operation['path'])
+
+    if not path:
+        raise ValueError('the whole document cannot be replaced')
+
+    parent = _resolve(document, path[:-1])
+    key = path[-1]
+
+    if isinstance(parent, list):
+        index = len(parent) if key == '-' else _list_index(key)
+
+        if op == 'add':
+            if index > len(parent):
+                raise IndexError('list index out of range')
+            parent.insert(index, operation['value'])
+        elif op in ('replace', 'remove'):
+            # The target must exist: '-' and len(parent) point past the last item
+            if index >= len(parent):
+                raise IndexError('list index out of range')
+
+            if op == 'replace':
+                parent[index] = operation['value']
+            else:
+                del parent[index]
+        else:
+            raise ValueError('unknown operation ' + op)
+    elif isinstance(parent, dict):
+        if op in ('add', 'replace'):
+            parent[key] = operation['value']
+        elif op == 'remove':
+            del parent[key]
+        else:
+            raise ValueError('unknown operation ' + op)
+    else:
+        raise TypeError('{0} is not a container'.format(operation['path']))
+
+
+def _resolve(document, path):
+    for key in path:
+        document = document[_list_index(key)] if isinstance(document, list) else document[key]
+
+    return document
+
+
+def _list_index(key):
+    # A JSON Pointer array index is a non-negative integer without leading zeros, unlike what int() accepts
+    if not key.isdigit() or (len(key) > 1 and key[0] == '0'):
+        raise ValueError('invalid list index ' + key)
+
+    return int(key)
+
+
+def _parse_path(path):
+    if path == '':
+        return []
+
+    if not path.startswith('/'):
+        raise ValueError('{0} is not a valid path'.format(path))
+
+    return [key.replace('~1', '/').replace('~0', '~') for key in path[1:].split('/')]
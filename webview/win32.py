@@ -207,7 +207,7 @@ class BrowserView(object):
     def toggle_fullscreen(self):
         raise NotImplementedError("toggle_fullscreen not implemented for Win32. Use Windows Forms implementation")
 
-    def evaluate_js(self):
+    def evaluate_js(self, script, timeout=None):
         raise NotImplementedError("evaluate_js not implemented for Win32. Use Windows Forms implementation")
 
     def create_file_dialog(self, dialog_type, directory, allow_multiple, save_filename):
@@ -320,5 +320,5 @@ def toggle_fullscreen(uid):
     BrowserView.instance.toggle_fullscreen()
 
 
-def evaluate_js(script, uid):
-    return BrowserView.instance.evaluate_js(script)
+def evaluate_js(script, uid, timeout=None):
+    return BrowserView.instance.evaluate_js(script, timeout)
@@ -28,7 +28,7 @@ from System.Drawing import Size, Point, Icon, Color, ColorTranslator, SizeF
 from WebBrowserInterop import IWebBrowserInterop
 
 from webview import OPEN_DIALOG, FOLDER_DIALOG, SAVE_DIALOG
-from webview import _parse_file_type, _parse_api_js, _js_bridge_call
+from webview import _parse_file_type, _parse_api_js, _js_bridge_call, _read_js, _create_js_bridge, _shutdown_js_bridge, _JSEvaluator
 
 from webview.localization import localization
 from webview.win32_shared import set_ie_mode
@@ -55,6 +55,7 @@ class BrowserView:
         def __init__(self, uid, title, url, width, height, resizable, fullscreen, min_size,
                      confirm_quit, background_color, debug, js_api, webview_ready):
             self.uid = uid
+            _create_js_bridge(uid)
             self.Text = title
             self.ClientSize = Size(width, height)
             self.MinimumSize = Size(min_size[0], min_size[1])
@@ -86,7 +87,7 @@ class BrowserView:
             self.web_browser.WebBrowserShortcutsEnabled = False
             self.web_browser.DpiAware = True
 
-            self.js_result_semaphor = threading.Semaphore(0)
+            self.js_evaluator = _JSEvaluator(self._schedule, self.load_event)
             self.js_bridge = BrowserView.JSBridge()
             self.js_bridge.parent_uid = uid
             self.web_browser.ObjectForScripting = self.js_bridge
@@ -122,14 +123,22 @@ class BrowserView:
                 self.toggle_fullscreen()
 
         def _initialize_js(self):
-            with open(os.path.join(base_dir, 'js', 'alert.js')) as f:
-                self.web_browser.Document.InvokeScript('eval', (f.read(),))
+            self.web_browser.Document.InvokeScript('eval', (_read_js('alert.js'),))
+
+        def _schedule(self, func):
+            if self.web_browser.InvokeRequired:
+                # BeginInvoke does not block, so that a busy GUI thread does not block the caller
+                self.web_browser.BeginInvoke(Func[Type](func))
+            else:
+                func()
 
         def on_shown(self, sender, args):
             self.webview_ready.set()
 
         def on_close(self, sender, args):
             del BrowserView.instances[self.uid]
+            _shutdown_js_bridge(self.uid)
+            self.js_evaluator.close()
 
             if len(BrowserView.instances) == 0:
                 WinForms.Application.Exit()
@@ -165,8 +174,6 @@ class BrowserView:
         def on_document_completed(self, sender, args):
             self._initialize_js()
 
-            self.load_event.set()
-
             if self.first_load:
                 self.web_browser.Visible = True
                 self.first_load = False
@@ -175,7 +182,7 @@ class BrowserView:
                 document = self.web_browser.Document
                 document.InvokeScript('eval', (_parse_api_js(self.js_bridge.api),))
 
-            self.load_event.set()
+            self.js_evaluator.loaded()
 
         def toggle_fullscreen(self):
             if not self.is_fullscreen:
@@ -337,23 +344,22 @@ def toggle_fullscreen(uid):
 def destroy_window(uid):
     window = BrowserView.instances[uid]
     window.Close()
-    window.js_result_semaphor.release()
 
+    # Complete pending evaluate_js calls
+    window.js_evaluator.close()
 
-def evaluate_js(script, uid):
-    def _evaluate_js():
-        document = window.web_browser.Document
-        window.js_result = document.InvokeScript('eval', (script,))
-        window.js_result_semaphor.release()
 
+def evaluate_js(script, uid, timeout=None):
     window = BrowserView.instances[uid]
+    return window.js_evaluator.wait(lambda: window.web_browser.Document.InvokeScript('eval', (script,)), timeout)
 
-    window.load_event.wait()
-    if window.web_browser.InvokeRequired:
-        window.web_browser.Invoke(Func[Type](_evaluate_js))
-    else:
-        _evaluate_js()
 
-    window.js_result_semaphor.acquire()
+def evaluate_js_async(script, uid, callback):
+    window = BrowserView.instances[uid]
+    token = window.js_evaluator.evaluate(lambda: window.web_browser.Document.InvokeScript('eval', (script,)), callback)
+    return lambda: window.js_evaluator.discard(token)
+
 
-    return window.js_result
+def schedule(func, uid=None):
+    window = BrowserView.instances[uid] if uid is not None else list(BrowserView.instances.values())[0]
+    window._schedule(func)